@@ -1,8 +1,11 @@
+import base64
+import binascii
+from datetime import date
 from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List
+from typing import List, Optional, Tuple
 from . import database, schemas
 
 app = FastAPI(title="Medical Data Warehouse API")
@@ -12,16 +15,47 @@ def read_root():
     return RedirectResponse(url="/docs")
 
 @app.get("/api/reports/top-products", response_model=List[schemas.TopProduct])
-def get_top_products(limit: int = 10, db: Session = Depends(database.get_db)):
-    # Simple keyword frequency as query proxy for "products"
-    result = db.execute(text("""
-        SELECT 
-            word as product_name, 
-            nentry as mention_count
-        FROM ts_stat('SELECT to_tsvector(''english'', message_text) FROM raw.telegram_messages')
-        ORDER BY mention_count DESC
-        LIMIT :limit
-    """), {"limit": limit}).fetchall()
+def get_top_products(
+    limit: int = 10,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    channel: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+):
+    # Simple keyword frequency as query proxy for "products", read from the
+    # term-frequency marts dbt maintains after each load
+    try:
+        if start_date is None and end_date is None and channel is None:
+            # All-time totals: an index scan on mention_count
+            result = db.execute(text("""
+                SELECT
+                    term as product_name,
+                    mention_count
+                FROM public_marts.agg_term_frequency
+                ORDER BY mention_count DESC
+                LIMIT :limit
+            """), {"limit": limit}).fetchall()
+        else:
+            result = db.execute(text("""
+                SELECT
+                    term as product_name,
+                    SUM(mention_count) as mention_count
+                FROM public_marts.fct_term_frequency
+                WHERE (CAST(:start_date AS date) IS NULL OR date_day >= CAST(:start_date AS date))
+                  AND (CAST(:end_date AS date) IS NULL OR date_day <= CAST(:end_date AS date))
+                  AND (CAST(:channel AS text) IS NULL OR channel_name = CAST(:channel AS text))
+                GROUP BY term
+                ORDER BY mention_count DESC
+                LIMIT :limit
+            """), {
+                "start_date": start_date,
+                "end_date": end_date,
+                "channel": channel.lstrip("@") if channel else None,
+                "limit": limit,
+            }).fetchall()
+    except Exception as e:
+        # Fallback if mart not ready
+        raise HTTPException(status_code=503, detail=f"Analytics data not available yet. Error: {e}")
     return result
 
 @app.get("/api/channels/{channel_name}/activity", response_model=schemas.ChannelActivity)
@@ -44,23 +78,55 @@ def get_channel_activity(channel_name: str, db: Session = Depends(database.get_d
         "activity": [{"date": r.date, "post_count": r.post_count} for r in result]
     }
 
+def encode_search_cursor(rank: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{rank!r}:{row_id}".encode()).decode()
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(rank), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/api/search/messages", response_model=List[schemas.Message])
-def search_messages(query: str, limit: int = 20, db: Session = Depends(database.get_db)):
+def search_messages(
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = Query(None, description="`cursor` of the last result of the previous page"),
+    db: Session = Depends(database.get_db),
+):
+    # Web-search syntax ("quoted phrase", -exclude, or) against the GIN-indexed
+    # message_tsv column, most relevant first. Pages are keyset-paginated on
+    # (rank, id), so deep pages cost the same as the first one.
+    after_rank, after_id = decode_search_cursor(cursor) if cursor else (None, None)
     result = db.execute(text("""
         SELECT 
+            m.id,
             m.message_id,
             m.channel_name,
             m.date,
             m.message_text as text,
             m.views,
-            c.category as image_category
+            c.category as image_category,
+            ts_rank(m.message_tsv, q.query) as rank
         FROM raw.telegram_messages m
-        LEFT JOIN raw.image_categories c ON m.message_id = c.message_id
-        WHERE m.message_text ILIKE :query
+        CROSS JOIN websearch_to_tsquery('english', :query) AS q(query)
+        LEFT JOIN raw.image_categories c
+            ON m.message_id = c.message_id
+           AND m.channel_name = c.channel_name
+        WHERE m.message_tsv @@ q.query
+          AND (
+              CAST(:after_rank AS real) IS NULL
+              OR (ts_rank(m.message_tsv, q.query), m.id) < (CAST(:after_rank AS real), CAST(:after_id AS integer))
+          )
+        ORDER BY rank DESC, m.id DESC
         LIMIT :limit
-    """), {"query": f"%{query}%", "limit": limit}).fetchall()
-    
-    return result
+    """), {"query": query, "after_rank": after_rank, "after_id": after_id, "limit": limit}).fetchall()
+
+    return [
+        {**row._mapping, "cursor": encode_search_cursor(row.rank, row.id)}
+        for row in result
+    ]
 
 @app.get("/api/reports/visual-content", response_model=List[schemas.VisualStats])
 def get_visual_content_stats(db: Session = Depends(database.get_db)):
@@ -21,6 +21,9 @@ class Message(BaseModel):
     text: str
     views: int
     image_category: Optional[str] = None
+    # Search relevance, and the cursor to pass back for the results after this one
+    rank: Optional[float] = None
+    cursor: Optional[str] = None
 
 class VisualStats(BaseModel):
     channel_name: str
@@ -0,0 +1,15 @@
+{#
+    High-water-mark filter for incremental models: rows whose `column` is newer
+    than the latest `this_column` already in {{ this }}.
+
+    The mark is pushed back by var('incremental_lookback') so rows committed
+    late (a load still running when dbt started) are picked up by the next
+    run; models use delete+insert on their key, so re-selecting them is harmless.
+#}
+{% macro incremental_watermark(column, this_column=none) %}
+    {{ column }} > (
+        select coalesce(max({{ this_column or column }}), '-infinity'::timestamp)
+            - interval '{{ var("incremental_lookback", "1 hour") }}'
+        from {{ this }}
+    )
+{% endmacro %}
@@ -0,0 +1,16 @@
+{#
+    Post-hook that creates an index on the model's table if it doesn't exist:
+
+        post_hook=["{{ create_index(['channel_name', 'message_id'], unique=true) }}"]
+
+    Unlike the `indexes` model config, which dbt applies only when it
+    (re)creates the table, this also reaches incremental models that were
+    built before the index was added. Names are <table>_<columns>_idx
+    (or _brin).
+#}
+{% macro create_index(columns, unique=false, using='btree') %}
+    {%- set suffix = 'brin' if using == 'brin' else 'idx' -%}
+    create {{ 'unique ' if unique }}index if not exists
+        {{ this.identifier }}_{{ columns | join('_') }}_{{ suffix }}
+    on {{ this }} using {{ using }} ({{ columns | join(', ') }})
+{% endmacro %}
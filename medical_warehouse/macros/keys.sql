@@ -0,0 +1,9 @@
+{#
+    Deterministic surrogate key for a channel: the first 64 bits of
+    md5(channel_name) as a bigint. The same channel always gets the same key,
+    so facts can compute it without joining dim_channels and adding a channel
+    never renumbers existing keys.
+#}
+{% macro channel_key(channel_name) %}
+    ('x' || substr(md5({{ channel_name }}), 1, 16))::bit(64)::bigint
+{% endmacro %}
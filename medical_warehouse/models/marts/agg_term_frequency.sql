@@ -0,0 +1,39 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='term',
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "{{ create_index(['term'], unique=true) }}",
+            "{{ create_index(['mention_count']) }}",
+            "{{ create_index(['last_ingested_at']) }}"
+        ]
+    )
+}}
+
+-- All-time totals per term, for the unfiltered top-products report (an
+-- index scan on mention_count instead of summing fct_term_frequency).
+
+with daily as (
+    select * from {{ ref('fct_term_frequency') }}
+)
+
+{% if is_incremental() %}
+-- Only terms whose daily counts were rebuilt since the last run
+, touched_terms as (
+    select distinct term
+    from daily
+    where {{ incremental_watermark('last_ingested_at') }}
+)
+{% endif %}
+
+select
+    term,
+    sum(document_count) as document_count,
+    sum(mention_count) as mention_count,
+    max(last_ingested_at) as last_ingested_at
+from daily
+{% if is_incremental() %}
+where term in (select term from touched_terms)
+{% endif %}
+group by term
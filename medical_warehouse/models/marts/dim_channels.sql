@@ -1,24 +1,47 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='channel_key',
+        incremental_strategy='delete+insert',
+        post_hook=["{{ create_index(['channel_key'], unique=true) }}"]
+    )
+}}
+
 with stg_messages as (
     select * from {{ ref('stg_telegram_messages') }}
 ),
 
+{% if is_incremental() %}
+-- Channels with messages loaded or updated since the last run; the others keep their row
+touched_channels as (
+    select distinct channel_name
+    from stg_messages
+    where {{ incremental_watermark('ingested_at', 'last_ingested_at') }}
+),
+{% endif %}
+
 channel_stats as (
     select
         channel_name,
         min(message_date) as first_post_date,
         max(message_date) as last_post_date,
         count(*) as total_posts,
-        avg(view_count) as avg_views
+        avg(view_count) as avg_views,
+        max(ingested_at) as last_ingested_at
     from stg_messages
+    {% if is_incremental() %}
+    where channel_name in (select channel_name from touched_channels)
+    {% endif %}
     group by 1
 )
 
 select
-    row_number() over (order by channel_name) as channel_key,
+    {{ channel_key('channel_name') }} as channel_key,
     channel_name,
     'Unknown' as channel_type, -- Placeholder as not in raw data
     first_post_date,
     last_post_date,
     total_posts,
-    avg_views
+    avg_views,
+    last_ingested_at
 from channel_stats
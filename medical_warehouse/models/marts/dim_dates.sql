@@ -1,7 +1,22 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='date_key',
+        incremental_strategy='delete+insert',
+        post_hook=["{{ create_index(['date_key'], unique=true) }}"]
+    )
+}}
+
 with date_spine as (
     select
-        distinct date(message_date) as date_day
+        date(message_date) as date_day,
+        max(ingested_at) as last_ingested_at
     from {{ ref('stg_telegram_messages') }}
+    {% if is_incremental() %}
+    -- Only days that received new messages since the last run
+    where {{ incremental_watermark('ingested_at', 'last_ingested_at') }}
+    {% endif %}
+    group by 1
 )
 
 select
@@ -14,5 +29,6 @@ select
     to_char(date_day, 'Month') as month_name,
     extract(quarter from date_day) as quarter,
     extract(year from date_day) as year,
-    case when extract(isodow from date_day) in (6, 7) then true else false end as is_weekend
+    case when extract(isodow from date_day) in (6, 7) then true else false end as is_weekend,
+    last_ingested_at
 from date_spine
@@ -1,3 +1,28 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel_name', 'message_id'],
+        incremental_strategy='delete+insert',
+        pre_hook="
+            {% if is_incremental() %}
+            -- A re-processed image may now have no detections, so it has no rows
+            -- below to replace the old ones with: clear those messages first
+            delete from {{ this }} f
+            using {{ source('raw', 'image_categories') }} c
+            where f.channel_name = c.channel_name
+              and f.message_id = c.message_id
+              and {{ incremental_watermark('c.processed_date', 'processed_at') }}
+            {% endif %}
+        ",
+        post_hook=[
+            "{{ create_index(['channel_name', 'message_id']) }}",
+            "{{ create_index(['channel_key']) }}",
+            "{{ create_index(['processed_at']) }}",
+            "{{ create_index(['message_ingested_at']) }}"
+        ]
+    )
+}}
+
 with detections as (
     select * from {{ source('raw', 'yolo_detections') }}
 ),
@@ -12,12 +37,24 @@ messages as (
 
 select
     m.message_id,
+    m.channel_name,
     m.channel_key,
     m.date_key,
     d.detected_class,
     d.confidence,
-    c.category as image_category
+    c.category as image_category,
+    c.processed_date as processed_at,
+    m.ingested_at as message_ingested_at
 from messages m
-inner join detections d on m.message_id = d.message_id
-left join categories c on m.message_id = c.message_id
-
+inner join detections d
+    on m.message_id = d.message_id
+   and m.channel_name = d.channel_name
+left join categories c
+    on m.message_id = c.message_id
+   and m.channel_name = c.channel_name
+{% if is_incremental() %}
+-- Messages whose image was (re)processed, or that were loaded after their
+-- image was, since the last run
+where {{ incremental_watermark('c.processed_date', 'processed_at') }}
+   or {{ incremental_watermark('m.ingested_at', 'message_ingested_at') }}
+{% endif %}
@@ -1,9 +1,24 @@
+{# ingested_at gets a B-tree, not BRIN: the incremental watermark reads max(ingested_at) #}
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel_name', 'message_id'],
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "{{ create_index(['channel_name', 'message_id'], unique=true) }}",
+            "{{ create_index(['channel_key', 'date_key']) }}",
+            "{{ create_index(['date_key']) }}",
+            "{{ create_index(['ingested_at']) }}"
+        ]
+    )
+}}
+
 with stg_messages as (
     select * from {{ ref('stg_telegram_messages') }}
-),
-
-dim_channels as (
-    select * from {{ ref('dim_channels') }}
+    {% if is_incremental() %}
+    -- Only messages loaded (or whose views/forwards changed) since the last run
+    where {{ incremental_watermark('ingested_at') }}
+    {% endif %}
 ),
 
 dim_dates as (
@@ -12,13 +27,14 @@ dim_dates as (
 
 select
     m.message_id,
-    c.channel_key,
+    m.channel_name,
+    {{ channel_key('m.channel_name') }} as channel_key,
     d.date_key,
     m.message_text,
     m.message_length,
     m.view_count,
     m.forward_count,
-    m.has_image
+    m.has_image,
+    m.ingested_at
 from stg_messages m
-left join dim_channels c on m.channel_name = c.channel_name
 left join dim_dates d on date(m.message_date) = d.full_date
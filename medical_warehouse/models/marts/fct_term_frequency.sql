@@ -0,0 +1,56 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['date_day', 'channel_name'],
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "{{ create_index(['date_day', 'channel_name']) }}",
+            "{{ create_index(['term']) }}",
+            "{{ create_index(['last_ingested_at']) }}"
+        ]
+    )
+}}
+
+-- Term counts per (day, channel, term) from the same english tsvector the
+-- search index uses (raw.telegram_messages.message_tsv), so terms are
+-- stemmed lexemes, as ts_stat() returned them.
+
+with messages as (
+    select
+        channel_name,
+        date(message_date) as date_day,
+        message_tsv,
+        ingested_at
+    from {{ ref('stg_telegram_messages') }}
+),
+
+{% if is_incremental() %}
+-- Days/channels that received messages since the last run are recounted
+-- whole; delete+insert on (date_day, channel_name) replaces their rows
+touched as (
+    select distinct channel_name, date_day
+    from messages
+    where {{ incremental_watermark('ingested_at', 'last_ingested_at') }}
+),
+{% endif %}
+
+scoped as (
+    select m.*
+    from messages m
+    {% if is_incremental() %}
+    inner join touched t
+        on m.channel_name = t.channel_name
+       and m.date_day = t.date_day
+    {% endif %}
+)
+
+select
+    s.date_day,
+    s.channel_name,
+    t.lexeme as term,
+    count(*) as document_count,
+    sum(coalesce(array_length(t.positions, 1), 1)) as mention_count,
+    max(s.ingested_at) as last_ingested_at
+from scoped s
+cross join lateral unnest(s.message_tsv) as t
+group by 1, 2, 3
@@ -11,7 +11,9 @@ renamed as (
         message_text,
         coalesce(views, 0) as view_count,
         coalesce(forwards, 0) as forward_count,
-        media_path
+        media_path,
+        message_tsv,
+        ingested_at
     from source
     where message_id is not null
 ),
@@ -0,0 +1,5 @@
+-- message_id is only unique within a channel
+select channel_name, message_id
+from {{ ref('fct_messages') }}
+group by channel_name, message_id
+having count(*) > 1
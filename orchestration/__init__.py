@@ -1,9 +1,18 @@
 from dagster import Definitions, load_assets_from_modules
+from dagster_dbt import DbtCliResource
 
-from .jobs import medical_data_pipeline
+from . import assets
+from .jobs import daily_assets_job, medical_data_pipeline
+from .resources import DBT_PROJECT_DIR, PostgresResource, YoloModelResource
 from .schedules import daily_schedule
 
 defs = Definitions(
-    jobs=[medical_data_pipeline],
+    assets=load_assets_from_modules([assets]),
+    jobs=[medical_data_pipeline, daily_assets_job],
     schedules=[daily_schedule],
+    resources={
+        "postgres": PostgresResource(),
+        "yolo": YoloModelResource(),
+        "dbt": DbtCliResource(project_dir=str(DBT_PROJECT_DIR), profiles_dir=str(DBT_PROJECT_DIR)),
+    },
 )
@@ -0,0 +1,129 @@
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from dagster import (
+    AssetExecutionContext,
+    BackfillPolicy,
+    DailyPartitionsDefinition,
+    Failure,
+    MaterializeResult,
+    asset,
+)
+from dagster_dbt import DbtCliResource
+
+from .ops import (
+    LoadConfig,
+    ScrapeConfig,
+    YoloConfig,
+    enrich_images,
+    load_partitions,
+    run_dbt,
+    scrape_partition,
+    throughput_metadata,
+)
+from .resources import PostgresResource, YoloModelResource
+
+# One partition per data lake directory (data/raw/telegram_messages/YYYY-MM-DD).
+# end_offset=1 includes today, so the daily run scrapes into today's
+# directory. "Today" is the partition timezone's date, not the host's.
+PARTITION_TIMEZONE = "UTC"
+daily_partitions = DailyPartitionsDefinition(
+    start_date="2026-01-01", end_offset=1, timezone=PARTITION_TIMEZONE
+)
+
+
+def current_partition_key() -> str:
+    """Today's partition key in the partitions' timezone."""
+    return datetime.now(ZoneInfo(PARTITION_TIMEZONE)).strftime("%Y-%m-%d")
+
+
+@asset(partitions_def=daily_partitions, group_name="raw")
+def raw_telegram_messages(context: AssetExecutionContext, config: ScrapeConfig) -> MaterializeResult:
+    """
+    The day's channel messages in the data lake.
+
+    Telegram only serves the channels' current history, so only today's
+    partition is scraped. Re-materializing an older partition re-reads the
+    files already on disk and fails if that day was never scraped.
+    """
+    from src.datalake import iter_channel_messages, list_channel_message_files
+
+    date_str = context.partition_key
+    if date_str == current_partition_key():
+        stats, elapsed = scrape_partition(config, date_str)
+        return MaterializeResult(
+            metadata=throughput_metadata(sum(stats.values()), elapsed, channels=stats)
+        )
+
+    files = list_channel_message_files(config.base_path, start_date=date_str, end_date=date_str)
+    if not files:
+        raise Failure(f"No data lake files for {date_str}; past days can't be re-scraped")
+    counts = {
+        os.path.splitext(os.path.basename(path))[0]: sum(1 for _ in iter_channel_messages(path))
+        for path in files
+    }
+    return MaterializeResult(metadata={"rows": sum(counts.values()), "channels": counts, "scraped": False})
+
+
+@asset(partitions_def=daily_partitions, deps=[raw_telegram_messages], group_name="raw")
+def raw_telegram_messages_table(
+    context: AssetExecutionContext, config: LoadConfig, postgres: PostgresResource
+) -> MaterializeResult:
+    """The partition's files loaded into raw.telegram_messages (unchanged files are skipped via the ledger)."""
+    date_str = context.partition_key
+    rows, elapsed = load_partitions(config, postgres, start_date=date_str, end_date=date_str)
+    return MaterializeResult(metadata=throughput_metadata(rows, elapsed))
+
+
+@asset(
+    partitions_def=daily_partitions,
+    # Only needs the partition's images on disk, so it runs alongside the load
+    deps=[raw_telegram_messages],
+    group_name="enrichment",
+    # CPU-bound: cap how many partitions run the model at once across all runs
+    # (set with `dagster instance concurrency set yolo <n>`)
+    op_tags={"dagster/concurrency_key": "yolo"},
+)
+def yolo_detections(
+    context: AssetExecutionContext, config: YoloConfig, postgres: PostgresResource, yolo: YoloModelResource
+) -> MaterializeResult:
+    """
+    YOLO detections for the photos referenced by the partition's messages.
+    CSV exports go to {output_path}/{date} so concurrent partitions never
+    append to the same file.
+    """
+    from src.datalake import partition_image_paths
+
+    date_str = context.partition_key
+    image_paths = partition_image_paths(config.base_path, date_str)
+    images, detections, elapsed, model_seconds = enrich_images(
+        config, postgres, yolo, image_paths=image_paths, output_path=os.path.join(config.output_path, date_str)
+    )
+    return MaterializeResult(
+        metadata=throughput_metadata(
+            images,
+            elapsed,
+            detections=detections,
+            partition_images=len(image_paths),
+            model_load_seconds=round(model_seconds, 2),
+        )
+    )
+
+
+@asset(
+    partitions_def=daily_partitions,
+    deps=[raw_telegram_messages_table, yolo_detections],
+    group_name="marts",
+    # The marts aren't partitioned tables: a backfill of N days runs dbt once
+    # after all N upstream partitions, not N times
+    backfill_policy=BackfillPolicy.single_run(),
+)
+def dbt_marts(context: AssetExecutionContext, dbt: DbtCliResource) -> MaterializeResult:
+    """
+    dbt models built over the raw tables. The incremental models pick up
+    whatever was ingested since their last run, so every partition in the
+    range is covered without passing the dates to dbt.
+    """
+    metadata, _ = run_dbt(dbt, ["run"])
+    return MaterializeResult(metadata=metadata)
@@ -1,10 +1,20 @@
-from dagster import job
+from dagster import AssetSelection, define_asset_job, job
+from .assets import daily_partitions
 from .ops import scrape_telegram_data, load_raw_to_postgres, run_yolo_enrichment, run_dbt_transformations
 
 @job
 def medical_data_pipeline():
-    # Define dependencies
-    scrape_logs = scrape_telegram_data()
-    load_logs = load_raw_to_postgres(scrape_logs)
-    yolo_logs = run_yolo_enrichment(load_logs)
-    dbt_logs = run_dbt_transformations(yolo_logs)
+    # Define dependencies: detection only needs the images on disk, so it
+    # runs alongside the load and dbt waits for both
+    scraped = scrape_telegram_data()
+    loaded = load_raw_to_postgres(start_after_scrape=scraped)
+    enriched = run_yolo_enrichment(start_after_scrape=scraped)
+    run_dbt_transformations(start_after_load=loaded, start_after_yolo=enriched)
+
+# Partitioned version of the pipeline: one run per day, and backfills launch
+# one run per selected day (see dagster_home/dagster.yaml for concurrency limits)
+daily_assets_job = define_asset_job(
+    "medical_data_assets",
+    selection=AssetSelection.all(),
+    partitions_def=daily_partitions,
+)
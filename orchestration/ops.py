@@ -1,46 +1,208 @@
-import os
-import subprocess
-from dagster import op, Out, Output, String
-
-# --- Helper to run shell commands ---
-def run_command(command, cwd=None):
-    process = subprocess.Popen(
-        command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=cwd
+import asyncio
+import time
+
+from dagster import Config, In, Nothing, OpExecutionContext, Output, op
+from dagster_dbt import DbtCliResource
+
+from .resources import PostgresResource, YoloModelResource
+
+# The pipeline modules are imported inside the ops: importing this file
+# (which Dagster does for every code-location load) stays cheap, and the
+# heavy dependencies are paid by the step processes that actually use them.
+
+
+def throughput_metadata(rows, seconds, **extra):
+    """Structured op metadata: row count, wall time and rows/s."""
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 2),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else 0.0,
+        **extra,
+    }
+
+
+# --- CONFIG ---
+
+class ScrapeConfig(Config):
+    base_path: str = "data"
+    limit: int = 100
+    concurrency: int = 1
+    rate: float = 1.0
+    burst: int = 5
+    download_workers: int = 4
+    full_refresh: bool = False
+    parquet: bool = False
+
+
+class LoadConfig(Config):
+    base_path: str = "data"
+    file_format: str = "json"
+    method: str = "copy"
+    workers: int = 1
+    full_refresh: bool = False
+
+
+class YoloConfig(Config):
+    base_path: str = "data"
+    images_dir: str = "data/raw/images"
+    batch_size: int = 16
+    prefetch_workers: int = 2
+    workers: int = 1
+    chunk_size: int = 500
+    output_path: str = "data/processed"
+    use_cache: bool = True
+    full_refresh: bool = False
+
+
+# --- STAGES (shared by the ops below and the partitioned assets) ---
+
+def scrape_partition(config: ScrapeConfig, date_str: str):
+    """Scrape the target channels into the date_str lake partition. Returns (stats, seconds)."""
+    from telethon import TelegramClient
+
+    from scripts.telegram import TARGET_CHANNELS, get_api_credentials, scrape_all_channels, setup_logging
+    from src.rate_limit import TokenBucket
+
+    setup_logging()
+    api_id, api_hash = get_api_credentials()
+    client = TelegramClient("telegram_scraper_session", api_id, api_hash)
+
+    async def run():
+        async with client:
+            return await scrape_all_channels(
+                client,
+                TARGET_CHANNELS,
+                config.base_path,
+                config.limit,
+                concurrency=config.concurrency,
+                rate_limiter=(
+                    TokenBucket(rate=config.rate, burst=config.burst) if config.concurrency > 1 else None
+                ),
+                download_workers=config.download_workers,
+                incremental=not config.full_refresh,
+                write_parquet=config.parquet,
+                date_str=date_str,
+            )
+
+    started = time.perf_counter()
+    stats = asyncio.run(run())
+    return stats, time.perf_counter() - started
+
+
+def load_partitions(config: LoadConfig, postgres: PostgresResource, start_date=None, end_date=None):
+    """Load lake partitions (all, or start_date..end_date) into Postgres. Returns (rows, seconds)."""
+    from scripts.loader import create_raw_schema, load_data, load_data_parallel
+
+    options = dict(
+        base_path=config.base_path,
+        file_format=config.file_format,
+        start_date=start_date,
+        end_date=end_date,
+        full_refresh=config.full_refresh,
+    )
+    with postgres.get_connection() as conn:
+        create_raw_schema(conn)
+        started = time.perf_counter()
+        if config.workers > 1:
+            # The pool hands out one connection per writer thread on top of this one;
+            # ThreadedConnectionPool raises rather than waits, so size must fit.
+            db_pool = postgres.pool if config.workers < postgres.max_connections else None
+            rows = load_data_parallel(conn, workers=config.workers, db_pool=db_pool, **options)
+        else:
+            rows = load_data(conn, method=config.method, **options)
+        return rows, time.perf_counter() - started
+
+
+def enrich_images(config: YoloConfig, postgres: PostgresResource, yolo: YoloModelResource,
+                  image_paths=None, output_path=None):
+    """
+    Run YOLO enrichment on image_paths (default: everything under images_dir).
+    Returns (images, detections, seconds, model_load_seconds).
+    """
+    from src.yolo_detect import DEFAULT_CACHE_PATH, run_enrichment
+
+    model_seconds = 0.0
+    if config.workers <= 1:
+        # Load the model up front so its cost is reported apart from the
+        # detection throughput; run_enrichment then reuses it from the cache
+        started = time.perf_counter()
+        yolo.get_model()
+        model_seconds = time.perf_counter() - started
+
+    with postgres.get_connection() as conn:
+        started = time.perf_counter()
+        detections, images = run_enrichment(
+            model_path=yolo.model_path,
+            images_dir=config.images_dir,
+            batch_size=config.batch_size,
+            prefetch_workers=config.prefetch_workers,
+            incremental=not config.full_refresh,
+            workers=config.workers,
+            chunk_size=config.chunk_size,
+            output_path=output_path or config.output_path,
+            cache_path=DEFAULT_CACHE_PATH if config.use_cache else None,
+            backend=yolo.backend,
+            conn=conn,
+            image_paths=image_paths,
+        )
+        return images, detections, time.perf_counter() - started, model_seconds
+
+
+def run_dbt(dbt: DbtCliResource, args):
+    """Run a dbt command. Returns (metadata, models) from run_results.json."""
+    started = time.perf_counter()
+    invocation = dbt.cli(args).wait()
+    elapsed = time.perf_counter() - started
+
+    results = invocation.get_artifact("run_results.json")["results"]
+    rows = sum((r.get("adapter_response") or {}).get("rows_affected") or 0 for r in results)
+    metadata = throughput_metadata(
+        rows,
+        elapsed,
+        models=len(results),
+        failed=sum(r["status"] not in ("success", "pass") for r in results),
     )
-    stdout, stderr = process.communicate()
-    if process.returncode != 0:
-        raise Exception(f"Command failed: {command}\nError: {stderr}")
-    return stdout
+    return metadata, len(results)
+
 
 # --- OPS ---
 
-@op(out=Out(String))
-def scrape_telegram_data():
-    """Runs the Telegram scraper script."""
-    # Using mock scraper to avoid API limits/bans during testing
-    # Was: result = run_command("python scripts/telegram.py --limit 100")
-    result = run_command("python scripts/mock_scraper.py")
-    return Output(result)
-
-@op(out=Out(String))
-def load_raw_to_postgres(start_after_scrape: String):
-    """Loads raw JSON data into PostgreSQL."""
-    # Takes dependency from scrape to ensure ordering
-    result = run_command("python scripts/loader.py")
-    return Output(result)
-
-@op(out=Out(String))
-def run_yolo_enrichment(start_after_load: String):
+@op
+def scrape_telegram_data(context: OpExecutionContext, config: ScrapeConfig):
+    """Scrapes the target channels into today's data lake partition."""
+    from scripts.telegram import today_str
+
+    date_str = today_str()
+    stats, elapsed = scrape_partition(config, date_str)
+    return Output(
+        stats,
+        metadata=throughput_metadata(sum(stats.values()), elapsed, date=date_str, channels=stats),
+    )
+
+
+@op(ins={"start_after_scrape": In(Nothing)})
+def load_raw_to_postgres(context: OpExecutionContext, config: LoadConfig, postgres: PostgresResource):
+    """Loads the raw data lake into raw.telegram_messages."""
+    rows, elapsed = load_partitions(config, postgres)
+    return Output(rows, metadata=throughput_metadata(rows, elapsed))
+
+
+@op(ins={"start_after_scrape": In(Nothing)})
+def run_yolo_enrichment(
+    context: OpExecutionContext, config: YoloConfig, postgres: PostgresResource, yolo: YoloModelResource
+):
     """Runs YOLO object detection on downloaded images."""
-    result = run_command("python src/yolo_detect.py")
-    return Output(result)
+    images, detections, elapsed, model_seconds = enrich_images(config, postgres, yolo)
+    return Output(
+        images,
+        metadata=throughput_metadata(
+            images, elapsed, detections=detections, model_load_seconds=round(model_seconds, 2)
+        ),
+    )
+
 
-@op(out=Out(String))
-def run_dbt_transformations(start_after_yolo: String):
+@op(ins={"start_after_load": In(Nothing), "start_after_yolo": In(Nothing)})
+def run_dbt_transformations(context: OpExecutionContext, dbt: DbtCliResource):
     """Runs dbt models to transform raw data into marts."""
-    # Run dbt from the medical_warehouse directory
-    cwd = os.path.join(os.getcwd(), "medical_warehouse")
-    result = run_command("dbt run", cwd=cwd)
-    # Also run tests?
-    # run_command("dbt test", cwd=cwd) 
-    return Output(result)
+    metadata, models = run_dbt(dbt, ["run"])
+    return Output(models, metadata=metadata)
@@ -0,0 +1,81 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from dagster import ConfigurableResource, InitResourceContext
+from dotenv import load_dotenv
+from psycopg2.pool import ThreadedConnectionPool
+from pydantic import PrivateAttr
+
+load_dotenv()
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DBT_PROJECT_DIR = PROJECT_ROOT / "medical_warehouse"
+
+
+class PostgresResource(ConfigurableResource):
+    """
+    Connection pool for one op step (defaults come from the DB_* env vars).
+
+    The default multiprocess executor runs every step in its own process with
+    its own resource instances, so the pool is shared by the threads of a
+    step (e.g. load_data_parallel's writers), not across the steps of a run.
+    """
+
+    host: str = os.getenv("DB_HOST", "localhost")
+    port: str = os.getenv("DB_PORT", "5432")
+    dbname: str = os.getenv("DB_NAME", "medical_warehouse")
+    user: str = os.getenv("DB_USER", "postgres")
+    password: str = os.getenv("DB_PASSWORD", "postgres")
+    max_connections: int = 8
+
+    _pool = PrivateAttr(default=None)
+
+    def setup_for_execution(self, context: InitResourceContext) -> None:
+        self._pool = ThreadedConnectionPool(
+            1,
+            self.max_connections,
+            host=self.host,
+            port=self.port,
+            dbname=self.dbname,
+            user=self.user,
+            password=self.password,
+        )
+
+    def teardown_after_execution(self, context: InitResourceContext) -> None:
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
+    @property
+    def pool(self) -> ThreadedConnectionPool:
+        return self._pool
+
+    @contextmanager
+    def get_connection(self):
+        """Borrow a connection; it is rolled back on error and returned to the pool."""
+        conn = self._pool.getconn()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.putconn(conn)
+
+
+class YoloModelResource(ConfigurableResource):
+    """YOLO weights and runtime. The model is loaded once per op step (each step is its own process)."""
+
+    model_path: str = "yolov8n.pt"
+    backend: str = "torch"
+
+    def runtime_path(self) -> str:
+        from src.yolo_detect import resolve_model
+
+        return resolve_model(self.model_path, self.backend)
+
+    def get_model(self):
+        from src.yolo_detect import get_model
+
+        return get_model(self.runtime_path())
@@ -1,8 +1,9 @@
-from dagster import ScheduleDefinition
-from .jobs import medical_data_pipeline
+from dagster import build_schedule_from_partitioned_job
+from .jobs import daily_assets_job
 
-# Schedule to run every day at midnight
-daily_schedule = ScheduleDefinition(
-    job=medical_data_pipeline,
-    cron_schedule="0 0 * * *",  # Every day at 00:00
+# Schedule to run every day at midnight, materializing that day's partition
+daily_schedule = build_schedule_from_partitioned_job(
+    daily_assets_job,
+    hour_of_day=0,
+    minute_of_hour=0,
 )
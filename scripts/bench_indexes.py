@@ -0,0 +1,271 @@
+"""
+EXPLAIN ANALYZE benchmark for the raw-schema indexes (src/pg_indexes.py).
+
+Builds a synthetic copy of raw.telegram_messages / yolo_detections /
+image_categories in a scratch schema (default: ~1M messages), runs the
+queries the API, dbt and the YOLO sink issue, then creates the managed
+indexes and runs them again. Prints execution time and plan shape before and
+after. The scratch schema is dropped at the end unless --keep is given.
+
+Usage:
+    python scripts/bench_indexes.py
+    python scripts/bench_indexes.py --rows 200000 --channels 10 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+
+# Allow running this file directly so `import src.*` works
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.loader import MESSAGE_TSV_COLUMN, get_db_connection
+from src.pg_indexes import RAW_INDEXES, create_indexes
+
+# Same columns and constraints as the production tables (loader.py / yolo_detect.py)
+SCHEMA_DDL = """
+    CREATE TABLE {schema}.telegram_messages (
+        id SERIAL PRIMARY KEY,
+        channel_name VARCHAR(255),
+        message_id BIGINT,
+        date TIMESTAMP,
+        message_text TEXT,
+        views INTEGER,
+        forwards INTEGER,
+        media_path TEXT,
+        ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        {message_tsv_column},
+        UNIQUE (channel_name, message_id)
+    );
+    CREATE TABLE {schema}.yolo_detections (
+        id SERIAL PRIMARY KEY,
+        image_path TEXT,
+        message_id BIGINT,
+        channel_name TEXT,
+        detected_class VARCHAR(50),
+        confidence DOUBLE PRECISION,
+        x1 DOUBLE PRECISION,
+        y1 DOUBLE PRECISION,
+        x2 DOUBLE PRECISION,
+        y2 DOUBLE PRECISION,
+        detection_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE {schema}.image_categories (
+        message_id BIGINT PRIMARY KEY,
+        channel_name TEXT,
+        image_path TEXT,
+        category VARCHAR(50),
+        processed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Messages are spread over the channels round-robin and dated one minute
+# apart (so row order follows date/ingestion order, as appends do). Every
+# third message has a photo with two detections. message_id is unique across
+# channels because raw.image_categories is still keyed on message_id alone.
+# (Literal % is doubled: these run with psycopg2 parameters.)
+SYNTHETIC_DATA = """
+    INSERT INTO {schema}.telegram_messages
+        (channel_name, message_id, date, message_text, views, forwards, media_path, ingested_at)
+    SELECT
+        'channel_' || (g %% %(channels)s),
+        g + 1,
+        TIMESTAMP '2024-01-01' + g * INTERVAL '1 minute',
+        'Paracetamol 500mg tablets, price ' || (g %% 997) || ' birr. Call ' || g,
+        (random() * 10000)::int,
+        (random() * 100)::int,
+        CASE WHEN g %% 3 = 0
+             THEN 'data/raw/images/channel_' || (g %% %(channels)s) || '/' || (g + 1) || '.jpg'
+        END,
+        TIMESTAMP '2024-01-01' + g * INTERVAL '1 minute' + INTERVAL '1 hour'
+    FROM generate_series(0, %(rows)s - 1) g;
+
+    INSERT INTO {schema}.yolo_detections
+        (image_path, message_id, channel_name, detected_class, confidence, x1, y1, x2, y2, detection_date)
+    SELECT
+        m.media_path, m.message_id, m.channel_name,
+        (ARRAY['bottle', 'person', 'cup', 'cell phone', 'book'])[1 + (m.id + k) %% 5],
+        random(), 0, 0, 100, 100,
+        m.ingested_at + INTERVAL '10 minutes'
+    FROM {schema}.telegram_messages m, generate_series(1, 2) k
+    WHERE m.media_path IS NOT NULL;
+
+    INSERT INTO {schema}.image_categories (message_id, channel_name, image_path, category, processed_date)
+    SELECT m.message_id, m.channel_name, m.media_path,
+           (ARRAY['promotional', 'product_display', 'lifestyle', 'other'])[1 + m.id %% 4],
+           m.ingested_at + INTERVAL '10 minutes'
+    FROM {schema}.telegram_messages m
+    WHERE m.media_path IS NOT NULL;
+"""
+
+# name -> SQL (parameters from query_params)
+QUERIES = {
+    # /api/channels/{channel_name}/activity
+    "channel_activity": """
+        SELECT DATE(date) AS date, COUNT(*) AS post_count
+        FROM {schema}.telegram_messages
+        WHERE channel_name = %(channel)s
+        GROUP BY DATE(date)
+        ORDER BY date
+    """,
+    # A channel's recent messages with their image category (message_id join)
+    "channel_recent_with_category": """
+        SELECT m.message_id, m.date, c.category
+        FROM {schema}.telegram_messages m
+        LEFT JOIN {schema}.image_categories c
+          ON c.channel_name = m.channel_name AND c.message_id = m.message_id
+        WHERE m.channel_name = %(channel)s
+          AND m.date >= %(recent_from)s
+    """,
+    # dbt incremental watermark filter on staging
+    "ingested_since_watermark": """
+        SELECT COUNT(*) FROM {schema}.telegram_messages
+        WHERE ingested_at > %(watermark)s
+    """,
+    # Date-range scans (partition-style reporting)
+    "date_range_day": """
+        SELECT COUNT(*), AVG(views) FROM {schema}.telegram_messages
+        WHERE date >= %(day_start)s AND date < %(day_start)s::timestamp + INTERVAL '1 day'
+    """,
+    # Detections for a message (fct_image_detections join key)
+    "detections_for_message": """
+        SELECT detected_class, confidence FROM {schema}.yolo_detections
+        WHERE channel_name = %(channel)s AND message_id = %(message_id)s
+    """,
+    # /api/search/messages: ranked full-text match, first page
+    "search_messages": """
+        SELECT m.id, ts_rank(m.message_tsv, q) AS rank
+        FROM {schema}.telegram_messages m, websearch_to_tsquery('english', %(search)s) q
+        WHERE m.message_tsv @@ q
+        ORDER BY rank DESC, m.id DESC
+        LIMIT 20
+    """,
+    # DetectionSink.flush: replace a chunk's detections by image_path
+    "detections_delete_by_image": """
+        DELETE FROM {schema}.yolo_detections WHERE image_path = ANY(%(image_paths)s)
+    """,
+}
+
+
+def query_params(cur, schema):
+    cur.execute(f"SELECT MIN(date), MAX(date), MAX(ingested_at) FROM {schema}.telegram_messages")
+    min_date, max_date, max_ingested = cur.fetchone()
+    cur.execute(
+        f"SELECT channel_name, message_id FROM {schema}.yolo_detections ORDER BY id DESC LIMIT 1"
+    )
+    channel, message_id = cur.fetchone()
+    cur.execute(
+        f"SELECT DISTINCT image_path FROM {schema}.yolo_detections ORDER BY image_path DESC LIMIT 500"
+    )
+    image_paths = [row[0] for row in cur.fetchall()]
+    return {
+        "channel": channel,
+        "message_id": message_id,
+        "recent_from": max_date - (max_date - min_date) / 100,
+        "watermark": max_ingested - (max_ingested - min_date) / 1000,
+        "day_start": min_date + (max_date - min_date) / 2,
+        "image_paths": image_paths,
+        # Matches a single synthetic message ("Call <n>")
+        "search": f"call {message_id}",
+    }
+
+
+def plan_nodes(plan):
+    """Node types of a JSON plan, depth first (e.g. 'Bitmap Heap Scan on telegram_messages')."""
+    label = plan["Node Type"]
+    if "Relation Name" in plan:
+        label += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        label += f" using {plan['Index Name']}"
+    nodes = [label]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def explain(conn, sql, params, repeat):
+    """Median execution time (ms) over repeat runs, plus the scan nodes of the last plan.
+
+    Each run is rolled back, so the DELETE benchmark measures the same rows every time.
+    """
+    timings = []
+    for _ in range(repeat):
+        with conn.cursor() as cur:
+            cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+            result = cur.fetchone()[0]
+        conn.rollback()
+        if isinstance(result, str):
+            result = json.loads(result)
+        timings.append(result[0]["Execution Time"])
+        plan = result[0]["Plan"]
+    scans = [n for n in plan_nodes(plan) if "Scan" in n]
+    return statistics.median(timings), scans
+
+
+def run_queries(conn, schema, params, repeat):
+    return {
+        name: explain(conn, sql.format(schema=schema), params, repeat)
+        for name, sql in QUERIES.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the raw-schema queries before/after indexing")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic messages (default: 1,000,000)")
+    parser.add_argument("--channels", type=int, default=20, help="Synthetic channels (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query; the median is reported (default: 3)")
+    parser.add_argument("--schema", default="bench_indexes", help="Scratch schema, dropped and recreated (default: bench_indexes)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema afterwards")
+    args = parser.parse_args()
+
+    schema = args.schema
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+            cur.execute(f"CREATE SCHEMA {schema};")
+            cur.execute(SCHEMA_DDL.format(schema=schema, message_tsv_column=MESSAGE_TSV_COLUMN))
+            print(f"Generating {args.rows:,} messages across {args.channels} channels...")
+            cur.execute(SYNTHETIC_DATA.format(schema=schema), {"rows": args.rows, "channels": args.channels})
+        conn.commit()
+
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"VACUUM ANALYZE {schema}.telegram_messages, {schema}.yolo_detections, {schema}.image_categories;")
+            params = query_params(cur, schema)
+        conn.autocommit = False
+
+        before = run_queries(conn, schema, params, args.repeat)
+
+        with conn.cursor() as cur:
+            create_indexes(cur, RAW_INDEXES, schema=schema)
+        conn.commit()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {schema}.telegram_messages, {schema}.yolo_detections, {schema}.image_categories;")
+        conn.autocommit = False
+
+        after = run_queries(conn, schema, params, args.repeat)
+
+        print(f"\n{'query':32} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name in QUERIES:
+            before_ms, before_scans = before[name]
+            after_ms, after_scans = after[name]
+            speedup = before_ms / after_ms if after_ms > 0 else float("inf")
+            print(f"{name:32} {before_ms:10.2f} {after_ms:10.2f} {speedup:7.1f}x")
+            print(f"    before: {'; '.join(before_scans)}")
+            print(f"    after:  {'; '.join(after_scans)}")
+    finally:
+        if not args.keep:
+            conn.rollback()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
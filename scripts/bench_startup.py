@@ -0,0 +1,128 @@
+"""
+Startup-time benchmark for the pipeline entry points.
+
+Imports each module in a fresh interpreter with `python -X importtime` and
+reports the cumulative import time, plus the heaviest top-level imports.
+Importing a module must stay cheap: heavy dependencies (ultralytics/torch,
+pandas, cv2) are loaded lazily when they are actually used.
+
+Usage:
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --repeat 5 --max-ms 500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Modules imported by the Dagster ops
+DEFAULT_MODULES = ["src.yolo_detect", "scripts.loader", "scripts.telegram"]
+
+# Dependencies that must not be pulled in by a plain import
+HEAVY_MODULES = ("ultralytics", "torch", "pandas", "cv2")
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output into a list of (cumulative_us, depth, module).
+    Depth 0 is an import made by the measured statement itself; nested imports
+    are indented two spaces per level under the module that triggered them.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((int(cumulative), depth, name.strip()))
+    return entries
+
+
+def run_importtime(statement):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(PROJECT_ROOT), env.get("PYTHONPATH", "")])
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+def interpreter_startup_modules():
+    """Modules every interpreter imports before running -c (site, encodings, ...)."""
+    return {name for _, depth, name in parse_importtime(run_importtime("pass").stderr) if depth == 0}
+
+
+def measure(module, baseline=frozenset()):
+    """
+    Import module in a fresh interpreter. Returns (total_us, heaviest, loaded_heavy)
+    where heaviest lists (cumulative_us, module) for the imports one level down.
+    """
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = run_importtime(probe)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    total_us = 0
+    children = []
+    block = []
+    # Entries are printed children-first: a depth-0 line closes the block of
+    # nested imports above it.
+    for us, depth, name in parse_importtime(result.stderr):
+        if depth == 0:
+            if name not in baseline:
+                total_us += us
+                children.extend(block)
+            block = []
+        elif depth == 1:
+            block.append((us, name))
+    loaded_heavy = [m for m in result.stdout.strip().split(",") if m]
+    return total_us, children, loaded_heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the pipeline modules")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES,
+                        help=f"Modules to import (default: {' '.join(DEFAULT_MODULES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module; the median is reported (default: 3)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports to list per module (default: 5)")
+    parser.add_argument("--max-ms", type=float, help="Exit non-zero if any module takes longer than this")
+    args = parser.parse_args()
+
+    baseline = interpreter_startup_modules()
+    failed = False
+    for module in args.modules:
+        try:
+            runs = [measure(module, baseline) for _ in range(max(args.repeat, 1))]
+        except RuntimeError as e:
+            print(e)
+            failed = True
+            continue
+
+        total_ms = statistics.median(us for us, _, _ in runs) / 1000
+        _, heaviest, loaded_heavy = runs[-1]
+        print(f"{module}: {total_ms:.1f} ms (median of {len(runs)})")
+        for us, name in sorted(heaviest, reverse=True)[:args.top]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+        if loaded_heavy:
+            print(f"    heavy dependencies loaded at import: {', '.join(loaded_heavy)}")
+            failed = True
+        if args.max_ms is not None and total_ms > args.max_ms:
+            print(f"    over budget ({args.max_ms:.0f} ms)")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
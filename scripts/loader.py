@@ -1,9 +1,24 @@
+import io
 import os
-import json
-import glob
+import hashlib
+import sys
+import time
+import argparse
 import psycopg2
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 
+# Allow running this file directly so `import src.*` works
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.datalake import iter_channel_messages, list_channel_message_files
+from src.pg_copy import rows_to_copy_buffer
+from src.pg_indexes import create_indexes
+
 load_dotenv()
 
 DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -21,8 +36,19 @@ def get_db_connection():
         password=DB_PASSWORD
     )
 
+# Full-text search vector for /api/search/messages. A stored generated column
+# is computed by Postgres on every INSERT/UPDATE, so it can't drift from
+# message_text whichever load method wrote the row.
+MESSAGE_TSV_COLUMN = (
+    "message_tsv tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('english', coalesce(message_text, ''))) STORED"
+)
+
 def create_raw_schema(conn):
     with conn.cursor() as cur:
+        # Serialize with the YOLO stage's setup (it runs in parallel with the load);
+        # concurrent CREATE ... IF NOT EXISTS can still collide on a fresh database
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('raw_schema_setup'));")
         cur.execute("CREATE SCHEMA IF NOT EXISTS raw;")
         cur.execute("""
             CREATE TABLE IF NOT EXISTS raw.telegram_messages (
@@ -34,47 +60,421 @@ def create_raw_schema(conn):
                 views INTEGER,
                 forwards INTEGER,
                 media_path TEXT,
-                ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT telegram_messages_channel_message_key UNIQUE (channel_name, message_id)
+            );
+        """)
+        # Tables created before search existed (one-time table rewrite). The
+        # catalog is checked first: ALTER TABLE takes an ACCESS EXCLUSIVE lock
+        # even when IF NOT EXISTS turns it into a no-op, which would queue
+        # behind concurrent loads and block API reads on every run.
+        cur.execute("""
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = 'raw.telegram_messages'::regclass
+              AND attname = 'message_tsv'
+              AND NOT attisdropped;
+        """)
+        if not cur.fetchone():
+            cur.execute(f"ALTER TABLE raw.telegram_messages ADD COLUMN IF NOT EXISTS {MESSAGE_TSV_COLUMN};")
+        # One row per lake file that has been loaded, to skip unchanged files
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS raw.load_ledger (
+                file_path TEXT PRIMARY KEY,
+                file_size BIGINT,
+                file_mtime DOUBLE PRECISION,
+                content_hash VARCHAR(64),
+                rows_loaded INTEGER,
+                loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
         """)
+        create_indexes(cur, ["telegram_messages"])
+        conn.commit()
+    migrate_natural_key(conn)
+
+def migrate_natural_key(conn):
+    """Add the (channel_name, message_id) key to tables created before it existed.
+
+    Older loads re-inserted every file on every run, so duplicates are removed
+    first, keeping the most recently loaded copy of each message.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'telegram_messages_channel_message_key'
+              AND conrelid = 'raw.telegram_messages'::regclass;
+        """)
+        if cur.fetchone():
+            return
+
+        cur.execute("LOCK TABLE raw.telegram_messages IN SHARE ROW EXCLUSIVE MODE;")
+        cur.execute("""
+            DELETE FROM raw.telegram_messages t
+            USING raw.telegram_messages newer
+            WHERE t.channel_name = newer.channel_name
+              AND t.message_id = newer.message_id
+              AND t.id < newer.id;
+        """)
+        removed = cur.rowcount
+        cur.execute("""
+            ALTER TABLE raw.telegram_messages
+            ADD CONSTRAINT telegram_messages_channel_message_key UNIQUE (channel_name, message_id);
+        """)
         conn.commit()
+        print(f"Added natural key to raw.telegram_messages ({removed} duplicate rows removed)")
+
+# Columns filled from each lake record, in COPY order
+LOAD_COLUMNS = ("channel_name", "message_id", "date", "message_text", "views", "forwards", "media_path")
+
+# Re-loading a message only touches the row when its engagement changed (or
+# its image arrived later); ingested_at then marks it for incremental models.
+UPSERT_CLAUSE = """
+    ON CONFLICT (channel_name, message_id) DO UPDATE SET
+        views = EXCLUDED.views,
+        forwards = EXCLUDED.forwards,
+        media_path = COALESCE(EXCLUDED.media_path, raw.telegram_messages.media_path),
+        ingested_at = CURRENT_TIMESTAMP
+    WHERE raw.telegram_messages.views IS DISTINCT FROM EXCLUDED.views
+       OR raw.telegram_messages.forwards IS DISTINCT FROM EXCLUDED.forwards
+       OR (raw.telegram_messages.media_path IS NULL AND EXCLUDED.media_path IS NOT NULL)
+"""
+
+def create_staging_table(cur):
+    # Temp tables are never WAL-logged and are private to the connection, so
+    # this is an unlogged staging area that parallel loaders can't collide on.
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS telegram_messages_staging (
+            channel_name VARCHAR(255),
+            message_id BIGINT,
+            date TIMESTAMP,
+            message_text TEXT,
+            views INTEGER,
+            forwards INTEGER,
+            media_path TEXT
+        ) ON COMMIT DELETE ROWS;
+    """)
+
+def message_row(channel_name, msg):
+    return (
+        channel_name,
+        msg.get('message_id'),
+        msg.get('message_date'),
+        msg.get('message_text'),
+        msg.get('views'),
+        msg.get('forwards'),
+        msg.get('image_path')
+    )
+
+def partition_copy_buffer(file_path, channel_name):
+    return rows_to_copy_buffer(
+        message_row(channel_name, msg) for msg in iter_channel_messages(file_path)
+    )
+
+def copy_and_merge(cur, buffer):
+    """COPY a prepared buffer into staging, then merge with one set-based insert."""
+    create_staging_table(cur)
+    cur.copy_expert(
+        f"COPY telegram_messages_staging ({', '.join(LOAD_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+    # DISTINCT ON: a partition may hold the same message twice (e.g. an
+    # interrupted scrape, or a photo retry recording it again with its
+    # image), and ON CONFLICT can't touch one row twice.
+    cur.execute(f"""
+        INSERT INTO raw.telegram_messages ({', '.join(LOAD_COLUMNS)})
+        SELECT DISTINCT ON (channel_name, message_id) {', '.join(LOAD_COLUMNS)}
+        FROM telegram_messages_staging
+        ORDER BY channel_name, message_id, media_path IS NULL, views DESC NULLS LAST
+        {UPSERT_CLAUSE};
+    """)
+
+def load_file_copy(cur, file_path, channel_name):
+    """Bulk load one partition: COPY into staging, then one set-based insert."""
+    buffer, count = partition_copy_buffer(file_path, channel_name)
+    copy_and_merge(cur, buffer)
+    return count
+
+def load_file_insert(cur, file_path, channel_name):
+    """Row-by-row load of one partition (slow; kept for debugging)."""
+    count = 0
+    for msg in iter_channel_messages(file_path):
+        count += 1
+        cur.execute(f"""
+            INSERT INTO raw.telegram_messages 
+            (channel_name, message_id, date, message_text, views, forwards, media_path)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            {UPSERT_CLAUSE};
+        """, message_row(channel_name, msg))
+    return count
+
+LOAD_METHODS = {
+    "copy": load_file_copy,
+    "insert": load_file_insert,
+}
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_load_ledger(cur):
+    cur.execute("SELECT file_path, file_size, file_mtime, content_hash FROM raw.load_ledger;")
+    return {row[0]: row[1:] for row in cur.fetchall()}
+
+def check_ledger(file_path, ledger_key, ledger):
+    """Decide whether a lake file needs loading.
+
+    Returns (needs_load, size, mtime, content_hash). Size and mtime are
+    compared first; the file is only hashed when they differ, so a touched
+    but unchanged file is skipped too.
+    """
+    stat = os.stat(file_path)
+    entry = ledger.get(ledger_key)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+        return False, stat.st_size, stat.st_mtime, entry[2]
+
+    content_hash = file_sha256(file_path)
+    if entry and entry[2] == content_hash:
+        return False, stat.st_size, stat.st_mtime, content_hash
+    return True, stat.st_size, stat.st_mtime, content_hash
+
+def record_load(cur, ledger_key, size, mtime, content_hash, rows_loaded):
+    cur.execute("""
+        INSERT INTO raw.load_ledger (file_path, file_size, file_mtime, content_hash, rows_loaded)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (file_path) DO UPDATE SET
+            file_size = EXCLUDED.file_size,
+            file_mtime = EXCLUDED.file_mtime,
+            content_hash = EXCLUDED.content_hash,
+            rows_loaded = COALESCE(EXCLUDED.rows_loaded, raw.load_ledger.rows_loaded),
+            loaded_at = CURRENT_TIMESTAMP;
+    """, (ledger_key, size, mtime, content_hash, rows_loaded))
 
-def load_data(conn):
-    base_path = "data/raw/telegram_messages"
-    json_files = glob.glob(f"{base_path}/*/*.json")
+def get_db_pool(maxconn):
+    return ThreadedConnectionPool(
+        1,
+        maxconn,
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
+
+def prepare_partition(file_path, base_path, ledger_entry):
+    """Parallel load, CPU half (runs in a worker process).
+
+    Checks the ledger and parses the partition into a COPY buffer. Returns a
+    dict; "buffer" is None when the file is unchanged.
+    """
+    ledger_key = os.path.relpath(file_path, base_path)
+    ledger = {ledger_key: ledger_entry} if ledger_entry else {}
+    needs_load, size, mtime, content_hash = check_ledger(file_path, ledger_key, ledger)
+
+    prepared = {
+        "file_path": file_path,
+        "ledger_key": ledger_key,
+        "size": size,
+        "mtime": mtime,
+        "content_hash": content_hash,
+        "touched": bool(ledger_entry) and ledger_entry[1] != mtime,
+        "buffer": None,
+        "count": 0,
+    }
+    if needs_load:
+        channel_name = os.path.splitext(os.path.basename(file_path))[0]
+        buffer, prepared["count"] = partition_copy_buffer(file_path, channel_name)
+        prepared["buffer"] = buffer.getvalue()
+    return prepared
+
+def write_partition(db_pool, prepared):
+    """Parallel load, I/O half (runs on a writer thread): one transaction per partition."""
+    conn = db_pool.getconn()
+    try:
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            if prepared["buffer"] is not None:
+                copy_and_merge(cur, io.StringIO(prepared["buffer"]))
+                rows_loaded = prepared["count"]
+            else:
+                rows_loaded = None
+            record_load(cur, prepared["ledger_key"], prepared["size"], prepared["mtime"],
+                        prepared["content_hash"], rows_loaded)
+        conn.commit()
+        return time.perf_counter() - started
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+# Parsed-but-unwritten partitions allowed per worker in load_data_parallel:
+# one being written plus one parsed and waiting for a writer.
+PARTITIONS_IN_FLIGHT_PER_WORKER = 2
+
+
+def load_data_parallel(conn, base_path="data", file_format="json", start_date=None, end_date=None,
+                       channels=None, full_refresh=False, workers=4, db_pool=None):
+    """Load partitions with a process pool parsing files and a thread pool writing them.
+
+    Each writer thread takes a connection from a shared pool and loads a whole
+    (date, channel) partition in its own transaction, so parsing and COPY
+    overlap across partitions. Pass db_pool (with room for `workers` more
+    connections) to reuse a caller's pool; otherwise one is opened and closed here.
+    At most workers * PARTITIONS_IN_FLIGHT_PER_WORKER partitions are parsed or
+    being written at a time, and each buffer is dropped once it is written.
+    """
+    json_files = list_channel_message_files(
+        base_path,
+        file_format=file_format,
+        start_date=start_date,
+        end_date=end_date,
+        channels=channels,
+    )
+    with conn.cursor() as cur:
+        ledger = {} if full_refresh else get_load_ledger(cur)
+
+    total = 0
+    skipped = 0
+    own_pool = db_pool is None
+    if own_pool:
+        db_pool = get_db_pool(workers)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as parsers, \
+                ThreadPoolExecutor(max_workers=workers) as writers:
+            # Partitions are submitted as slots free up, so at most
+            # max_in_flight parsed buffers are held at once however many
+            # days a backfill covers.
+            max_in_flight = workers * PARTITIONS_IN_FLIGHT_PER_WORKER
+            pending = iter(json_files)
+            in_flight = {}  # future -> prepared partition (None while parsing)
+
+            while True:
+                while len(in_flight) < max_in_flight:
+                    file_path = next(pending, None)
+                    if file_path is None:
+                        break
+                    future = parsers.submit(prepare_partition, file_path, base_path,
+                                            ledger.get(os.path.relpath(file_path, base_path)))
+                    in_flight[future] = None
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    prepared = in_flight.pop(future)
+                    if prepared is None:
+                        # Parsed: hand the buffer to a writer thread
+                        prepared = future.result()
+                        if prepared["buffer"] is None:
+                            skipped += 1
+                            if not prepared["touched"]:
+                                continue
+                        in_flight[writers.submit(write_partition, db_pool, prepared)] = prepared
+                        continue
+
+                    elapsed = future.result()
+                    if prepared["buffer"] is None:
+                        continue
+                    count = prepared["count"]
+                    total += count
+                    rate = count / elapsed if elapsed > 0 else float("inf")
+                    print(f"Loaded {count} messages from {prepared['file_path']} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    finally:
+        if own_pool:
+            db_pool.closeall()
+
+    if skipped:
+        print(f"Skipped {skipped} unchanged files (use --full-refresh to reload them)")
+    return total
+
+def load_data(conn, base_path="data", file_format="json", start_date=None, end_date=None, channels=None,
+              method="copy", full_refresh=False):
+    # JSON covers both the JSONL partitions and the older JSON array files.
+    # Date/channel filters prune partitions by path before any file is opened.
+    json_files = list_channel_message_files(
+        base_path,
+        file_format=file_format,
+        start_date=start_date,
+        end_date=end_date,
+        channels=channels,
+    )
+    load_file = LOAD_METHODS[method]
+    total = 0
+    skipped = 0
     
     with conn.cursor() as cur:
+        ledger = {} if full_refresh else get_load_ledger(cur)
+
         for file_path in json_files:
-            # Extract channel name from filename (e.g. "channel_name.json")
-            channel_name = os.path.basename(file_path).replace('.json', '')
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                messages = json.load(f)
-                
-            for msg in messages:
-                cur.execute("""
-                    INSERT INTO raw.telegram_messages 
-                    (channel_name, message_id, date, message_text, views, forwards, media_path)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT DO NOTHING; -- Assuming simple dedup logic for now if PK was composite
-                """, (
-                    channel_name,
-                    msg.get('message_id'),
-                    msg.get('message_date'),
-                    msg.get('message_text'),
-                    msg.get('views'),
-                    msg.get('forwards'),
-                    msg.get('image_path')
-                ))
-            print(f"Loaded {len(messages)} messages from {file_path}")
-        conn.commit()
+            # Ledger keys are relative to the lake root so the lake can move
+            ledger_key = os.path.relpath(file_path, base_path)
+            needs_load, size, mtime, content_hash = check_ledger(file_path, ledger_key, ledger)
+            if not needs_load:
+                if ledger[ledger_key][1] != mtime:
+                    # Touched but identical: remember the new mtime to skip hashing next time
+                    record_load(cur, ledger_key, size, mtime, content_hash, None)
+                    conn.commit()
+                skipped += 1
+                continue
+
+            # Extract channel name from filename (e.g. "channel_name.jsonl")
+            channel_name = os.path.splitext(os.path.basename(file_path))[0]
+
+            started = time.perf_counter()
+            count = load_file(cur, file_path, channel_name)
+            record_load(cur, ledger_key, size, mtime, content_hash, count)
+            # One transaction per partition (data + ledger entry)
+            conn.commit()
+            elapsed = time.perf_counter() - started
+
+            total += count
+            rate = count / elapsed if elapsed > 0 else float("inf")
+            print(f"Loaded {count} messages from {file_path} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+    if skipped:
+        print(f"Skipped {skipped} unchanged files (use --full-refresh to reload them)")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the raw data lake into raw.telegram_messages")
+    parser.add_argument("--path", default="data", help="Base data directory (default: data)")
+    parser.add_argument("--format", choices=["json", "parquet"], default="json",
+                        help="Partition format to read (default: json)")
+    parser.add_argument("--start-date", help="First partition date to load (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Last partition date to load (YYYY-MM-DD)")
+    parser.add_argument("--channel", action="append", dest="channels",
+                        help="Only load this channel (repeatable)")
+    parser.add_argument("--method", choices=sorted(LOAD_METHODS), default="copy",
+                        help="copy: COPY FROM STDIN + set-based merge (default); insert: one INSERT per row")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="Reload every file, ignoring raw.load_ledger")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Partitions parsed and loaded in parallel (default: 1, sequential)")
+    args = parser.parse_args()
+    if args.workers > 1 and args.method != "copy":
+        parser.error("--workers > 1 requires --method copy")
 
-if __name__ == "__main__":
     try:
         conn = get_db_connection()
         create_raw_schema(conn)
-        load_data(conn)
+        options = dict(
+            base_path=args.path,
+            file_format=args.format,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            channels=args.channels,
+            full_refresh=args.full_refresh,
+        )
+        if args.workers > 1:
+            load_data_parallel(conn, workers=args.workers, **options)
+        else:
+            load_data(conn, method=args.method, **options)
         conn.close()
         print("Data loading complete.")
     except Exception as e:
         print(f"Error loading data: {e}")
+
+if __name__ == "__main__":
+    main()
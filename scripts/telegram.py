@@ -2,10 +2,16 @@
 Telegram Scraper for Ethiopian Medical Channels
 ================================================
 This script scrapes public Telegram channels and stores:
-- Raw messages as JSON (partitioned by date): data/raw/telegram_messages/YYYY-MM-DD/channel.json
+- Raw messages as JSONL (partitioned by date): data/raw/telegram_messages/YYYY-MM-DD/channel.jsonl
 - Images: data/raw/images/{channel_name}/{message_id}.jpg
+- Optional Parquet copy (--parquet): data/raw/telegram_messages/YYYY-MM-DD/channel.parquet
 - CSV backup: data/raw/csv/YYYY-MM-DD/telegram_data.csv
 - Logs: logs/scrape_YYYY-MM-DD.log
+- Scrape state: data/raw/telegram_messages/_scrape_state.json (last message_id per channel,
+  plus photos that failed to download and are retried on the next runs)
+
+Runs are incremental: only messages newer than the stored high-water mark are
+fetched. Pass --full-refresh to re-fetch the newest --limit messages.
 
 Usage:
     python scripts/telegram.py --path data --limit 500
@@ -23,7 +29,7 @@ import logging
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from telethon import TelegramClient
 from telethon.errors import FloodWaitError
@@ -35,63 +41,185 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.datalake import write_channel_messages_json, write_manifest
+from src.datalake import (
+    channel_messages_jsonl_path,
+    iter_channel_messages,
+    open_channel_messages_writer,
+    write_channel_messages_parquet,
+    read_failed_downloads,
+    read_scrape_state,
+    write_manifest,
+    write_scrape_state,
+)
+from src.rate_limit import TokenBucket
 
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 
-load_dotenv()
-
-# Validate required environment variables before proceeding
-api_id_str = os.getenv("Tg_API_ID")
-api_hash = os.getenv("Tg_API_HASH")
+def get_api_credentials() -> Tuple[int, str]:
+    """
+    Read Tg_API_ID / Tg_API_HASH from the environment (and .env).
 
-if not api_id_str or not api_hash:
-    print("ERROR: Missing Tg_API_ID or Tg_API_HASH in .env file")
-    print("Create a .env file with:")
-    print("  Tg_API_ID=your_api_id")
-    print("  Tg_API_HASH=your_api_hash")
-    sys.exit(1)
+    Raises:
+        RuntimeError: if either variable is missing
+    """
+    load_dotenv()
+    api_id_str = os.getenv("Tg_API_ID")
+    api_hash = os.getenv("Tg_API_HASH")
+    if not api_id_str or not api_hash:
+        raise RuntimeError("Missing Tg_API_ID or Tg_API_HASH in .env file")
+    return int(api_id_str), api_hash
 
-api_id = int(api_id_str)
 
-# Date string for partitioning output files
-TODAY = datetime.today().strftime("%Y-%m-%d")
+def today_str() -> str:
+    """Date string for partitioning output files (evaluated per run, not at import)."""
+    return datetime.today().strftime("%Y-%m-%d")
 
 # Default throttling (seconds). You can override these via CLI args.
 DEFAULT_CHANNEL_DELAY = 3.0
 DEFAULT_MESSAGE_DELAY = 1.0
 
+# Concurrent mode: channels scraped at once and the shared API budget
+# (requests per second, burst size) used instead of the fixed delays above.
+DEFAULT_CONCURRENCY = 1
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 5
+
+# Parallel photo downloads per channel
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+# Runs that retry a failed photo download before giving up on it
+MAX_DOWNLOAD_ATTEMPTS = 3
+
+# Messages Telethon fetches per history request (GetHistoryRequest's maximum).
+# The rate limiter is charged once per page, not once per message.
+HISTORY_PAGE_SIZE = 100
+
 # =============================================================================
 # LOGGING SETUP
 # =============================================================================
 
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
 
-# Configure logging to both file and console
+# Handlers are attached by setup_logging() (called from main), so importing
+# this module doesn't create log files or touch the console configuration.
 logger = logging.getLogger("telegram_scraper")
 logger.setLevel(logging.INFO)
 
-# File handler - logs everything to file
-file_handler = logging.FileHandler(
-    os.path.join(LOG_DIR, f"scrape_{TODAY}.log"),
-    encoding="utf-8"
-)
-file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
 
-# Console handler - shows progress in terminal
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+def setup_logging(log_dir: str = LOG_DIR) -> None:
+    """Log to both logs/scrape_YYYY-MM-DD.log and the console (idempotent)."""
+    if logger.handlers:
+        return
+    os.makedirs(log_dir, exist_ok=True)
 
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+    # File handler - logs everything to file
+    file_handler = logging.FileHandler(
+        os.path.join(log_dir, f"scrape_{today_str()}.log"),
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+    # Console handler - shows progress in terminal
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
 
 # =============================================================================
 # SCRAPING FUNCTIONS
 # =============================================================================
 
+def write_csv_row(writer: csv.writer, message_dict: dict) -> None:
+    """Append one message to the CSV backup (column order matches the header)."""
+    writer.writerow([
+        message_dict["message_id"],
+        message_dict["channel_name"],
+        message_dict["channel_title"],
+        message_dict["message_date"],
+        message_dict["message_text"],
+        message_dict["has_media"],
+        message_dict["image_path"],
+        message_dict["views"],
+        message_dict["forwards"],
+    ])
+
+
+def message_record(message, channel_name: str, channel_title: str) -> dict:
+    """The lake record for a message; image_path is filled in once the photo is saved."""
+    return {
+        "message_id": message.id,
+        "channel_name": channel_name,
+        "channel_title": channel_title,
+        "message_date": message.date.isoformat(),  # ISO format for consistency
+        "message_text": message.message or "",     # Handle None text
+        "has_media": message.media is not None,
+        "image_path": None,                        # Set by the download worker
+        "views": message.views or 0,               # Some messages may not have views
+        "forwards": message.forwards or 0,
+    }
+
+
+async def download_photo(
+    client: TelegramClient,
+    message,
+    image_path: str,
+    rate_limiter: Optional[TokenBucket] = None,
+    max_retries: int = 3,
+) -> Optional[str]:
+    """
+    Download a message photo to image_path.
+
+    Returns:
+        The saved path, or None if the download failed
+    """
+    retries = 0
+    while True:
+        try:
+            if rate_limiter:
+                await rate_limiter.acquire()
+            await client.download_media(message.media, image_path)
+            return image_path
+        except FloodWaitError as e:
+            wait_seconds = max(int(getattr(e, "seconds", 0) or 0), 1)
+            retries += 1
+            if retries > max_retries:
+                logger.warning(f"Too many FloodWait retries downloading image for message {message.id}")
+                return None
+            if rate_limiter:
+                rate_limiter.on_flood_wait(wait_seconds)
+            else:
+                await asyncio.sleep(wait_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to download image for message {message.id}: {e}")
+            return None
+
+
+async def download_worker(
+    client: TelegramClient,
+    queue: asyncio.Queue,
+    on_done: Callable[[dict], None],
+    rate_limiter: Optional[TokenBucket] = None,
+) -> None:
+    """
+    Consume (message, message_dict, image_path) jobs from the queue.
+
+    Fills in message_dict["image_path"] once the download finishes and then
+    hands the completed dict to on_done. Runs until cancelled.
+    """
+    while True:
+        message, message_dict, image_path = await queue.get()
+        try:
+            message_dict["image_path"] = await download_photo(
+                client, message, image_path, rate_limiter=rate_limiter
+            )
+            on_done(message_dict)
+        finally:
+            queue.task_done()
+
+
 async def scrape_channel(
     client: TelegramClient,
     channel: str,
@@ -102,6 +230,12 @@ async def scrape_channel(
     message_delay: float = DEFAULT_MESSAGE_DELAY,
     channel_delay: float = DEFAULT_CHANNEL_DELAY,
     max_retries: int = 3,
+    rate_limiter: Optional[TokenBucket] = None,
+    download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+    min_id: int = 0,
+    high_water_marks: Optional[Dict[str, int]] = None,
+    write_parquet: bool = False,
+    failed_downloads: Optional[Dict[int, int]] = None,
 ) -> int:
     """
     Scrape a single Telegram channel and save messages + images.
@@ -110,106 +244,229 @@ async def scrape_channel(
         client: Authenticated TelegramClient instance
         channel: Channel username (e.g., '@lobelia4cosmetics')
         writer: CSV writer to append rows
-        image_dir: Directory to save downloaded images
-        json_save_dir: Directory to save JSON output
+        base_path: Base data directory (images and JSONL partition go under raw/)
+        date_str: Partition date (YYYY-MM-DD)
         limit: Maximum number of messages to scrape (default 100)
+        rate_limiter: Shared token bucket. When given, every API request
+            (entity lookup, history page, photo download) takes a token and
+            the fixed message/channel delays are skipped.
+        download_workers: Photos downloaded in parallel while iteration
+            continues. Iteration blocks once 2x this many are queued.
+        min_id: Only fetch messages newer than this id (0 = no lower bound).
+            New messages are appended to the day's existing partition.
+        high_water_marks: Updated in place with the newest message_id seen
+            once the channel's partition has been written successfully.
+        write_parquet: Also write the partition as {channel}.parquet
+        failed_downloads: This channel's {message_id: attempts} for photos
+            that failed to download. Those messages are re-fetched by id and
+            recorded again with their image once it downloads (the high-water
+            mark moves past them regardless). Updated in place on success;
+            ids are dropped after MAX_DOWNLOAD_ATTEMPTS runs.
     
     Returns:
         Number of messages scraped
     """
     channel_name = channel.strip('@')
-    
-    retries = 0
-    while True:
-        try:
-            # Get channel entity (validates channel exists and is accessible)
-            entity = await client.get_entity(channel)
-            channel_title = entity.title
-            messages = []
-
-            # Create image directory for this channel
-            # Path format: data/raw/images/{channel_name}/
-            channel_image_dir = os.path.join(base_path, "raw", "images", channel_name)
-            os.makedirs(channel_image_dir, exist_ok=True)
-
-            logger.info(f"Starting scrape of {channel} (limit={limit})")
-
-            # Iterate through channel messages (newest first by default)
-            async for message in client.iter_messages(entity, limit=limit):
-                image_path: Optional[str] = None
-                has_media = message.media is not None
-
-                # Download photo if present
-                # Challenge requires: data/raw/images/{channel_name}/{message_id}.jpg
-                if has_media and isinstance(message.media, MessageMediaPhoto):
-                    filename = f"{message.id}.jpg"
-                    image_path = os.path.join(channel_image_dir, filename)
-                    try:
-                        await client.download_media(message.media, image_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to download image for message {message.id}: {e}")
-                        image_path = None
-
-                # Build message dict with all required fields
-                message_dict = {
-                    "message_id": message.id,
-                    "channel_name": channel_name,
-                    "channel_title": channel_title,
-                    "message_date": message.date.isoformat(),  # ISO format for consistency
-                    "message_text": message.message or "",     # Handle None text
-                    "has_media": has_media,
-                    "image_path": image_path,
-                    "views": message.views or 0,               # Some messages may not have views
-                    "forwards": message.forwards or 0,
-                }
-
-                # Write to CSV (backup/alternative format)
-                writer.writerow([
-                    message_dict["message_id"],
-                    message_dict["channel_name"],
-                    message_dict["channel_title"],
-                    message_dict["message_date"],
-                    message_dict["message_text"],
-                    message_dict["has_media"],
-                    message_dict["image_path"],
-                    message_dict["views"],
-                    message_dict["forwards"],
-                ])
-
-                messages.append(message_dict)
-
-                # Optional delay between messages (reduces risk of rate limiting).
-                if message_delay and message_delay > 0:
-                    await asyncio.sleep(message_delay)
-
-            write_channel_messages_json(
-                base_path=base_path,
-                date_str=date_str,
-                channel_name=channel_name,
-                messages=messages,
-            )
-
-            logger.info(f"Finished scraping {channel}: {len(messages)} messages saved")
 
-            # Delay between channels (recommended).
-            if channel_delay and channel_delay > 0:
-                await asyncio.sleep(channel_delay)
-
-            return len(messages)
+    # Incremental runs add to today's partition instead of replacing it.
+    # Messages are streamed to disk as they complete; ids already in the
+    # partition (or written by a failed attempt) are not written twice.
+    append = bool(min_id)
+    partition_path = channel_messages_jsonl_path(base_path, date_str, channel_name)
+    seen_ids = (
+        {m["message_id"] for m in iter_channel_messages(partition_path)}
+        if append and os.path.exists(partition_path) else set()
+    )
 
-        except FloodWaitError as e:
-            # Telegram explicitly asks you to wait e.seconds
-            wait_seconds = int(getattr(e, "seconds", 0) or 0)
-            wait_seconds = max(wait_seconds, 1)
-            logger.warning(f"FloodWaitError for {channel}: sleeping {wait_seconds}s")
-            await asyncio.sleep(wait_seconds)
-            retries += 1
-            if retries > max_retries:
-                logger.error(f"Too many FloodWait retries for {channel}. Skipping.")
-                return 0
-        except Exception as e:
-            logger.error(f"Error scraping {channel}: {e}")
-            return 0
+    with open_channel_messages_writer(
+        base_path=base_path,
+        date_str=date_str,
+        channel_name=channel_name,
+        append=append,
+    ) as messages_writer:
+
+        def close_partial() -> int:
+            """
+            Close the partition after a failed scrape. Appending only adds
+            complete records, so they are kept; a fresh write would replace
+            a good partition with a partial one, so it is discarded unless
+            there was no partition yet. Returns the messages kept.
+            """
+            if messages_writer.closed:
+                # Failed after the partition was published (e.g. the Parquet copy)
+                return messages_writer.count
+            keep = append or not os.path.exists(partition_path)
+            messages_writer.close(commit=keep)
+            return messages_writer.count if keep else 0
+
+        def record(message_dict: dict) -> None:
+            # Write to CSV (backup/alternative format) and the JSONL partition
+            write_csv_row(writer, message_dict)
+            messages_writer.write(message_dict)
+            seen_ids.add(message_dict["message_id"])
+
+        # Outcome of this run's photo downloads, by message_id
+        downloaded = set()
+        download_failed = set()
+
+        def record_download(message_dict: dict) -> None:
+            if message_dict["image_path"] is None:
+                download_failed.add(message_dict["message_id"])
+                if message_dict["message_id"] in seen_ids:
+                    # A retry that failed again: the partition already has it
+                    return
+            else:
+                downloaded.add(message_dict["message_id"])
+            record(message_dict)
+
+        retries = 0
+        while True:
+            try:
+                # Get channel entity (validates channel exists and is accessible)
+                if rate_limiter:
+                    await rate_limiter.acquire()
+                entity = await client.get_entity(channel)
+                channel_title = entity.title
+                newest_id = min_id
+
+                # Create image directory for this channel
+                # Path format: data/raw/images/{channel_name}/
+                channel_image_dir = os.path.join(base_path, "raw", "images", channel_name)
+                os.makedirs(channel_image_dir, exist_ok=True)
+
+                logger.info(f"Starting scrape of {channel} (limit={limit}, min_id={min_id})")
+
+                # Photos are downloaded by a bounded worker pool so iteration
+                # keeps going; queue.put() blocks when the pool falls behind.
+                workers_count = max(download_workers, 1)
+                queue: asyncio.Queue = asyncio.Queue(maxsize=workers_count * 2)
+                workers = [
+                    asyncio.create_task(download_worker(client, queue, record_download, rate_limiter))
+                    for _ in range(workers_count)
+                ]
+
+                try:
+                    # Photos that failed on earlier runs: re-fetch those messages
+                    # by id (deleted ones come back as None) and queue them again
+                    retry_ids = sorted(failed_downloads) if failed_downloads else []
+                    retrying = set()
+                    missing_ids = set()
+                    for start in range(0, len(retry_ids), HISTORY_PAGE_SIZE):
+                        page_ids = retry_ids[start:start + HISTORY_PAGE_SIZE]
+                        if rate_limiter:
+                            await rate_limiter.acquire()
+                        for message_id, message in zip(page_ids, await client.get_messages(entity, ids=page_ids)):
+                            if message is None or not isinstance(message.media, MessageMediaPhoto):
+                                missing_ids.add(message_id)
+                                continue
+                            image_path = os.path.join(channel_image_dir, f"{message.id}.jpg")
+                            retrying.add(message.id)
+                            await queue.put((message, message_record(message, channel_name, channel_title), image_path))
+
+                    # Iterate through channel messages (newest first by default).
+                    # Incremental runs go oldest-first from min_id so a backlog
+                    # larger than `limit` is picked up by the next run, not skipped.
+                    # With a rate limiter the bucket paces the history requests,
+                    # so Telethon's own wait between pages is turned off.
+                    fetched = 0
+                    async for message in client.iter_messages(
+                        entity,
+                        limit=limit,
+                        min_id=min_id,
+                        reverse=bool(min_id),
+                        wait_time=0 if rate_limiter else None,
+                    ):
+                        # One token per history page: taken as the page's first
+                        # message arrives, so the next request waits on it.
+                        if rate_limiter and fetched % HISTORY_PAGE_SIZE == 0:
+                            await rate_limiter.acquire()
+                        fetched += 1
+
+                        newest_id = max(newest_id, message.id)
+                        if message.id in seen_ids or message.id in retrying:
+                            continue
+
+                        message_dict = message_record(message, channel_name, channel_title)
+
+                        # Queue photo download if present
+                        # Challenge requires: data/raw/images/{channel_name}/{message_id}.jpg
+                        if isinstance(message.media, MessageMediaPhoto):
+                            image_path = os.path.join(channel_image_dir, f"{message.id}.jpg")
+                            if os.path.exists(image_path) and os.path.getsize(image_path) > 0:
+                                # Already downloaded by an earlier run
+                                message_dict["image_path"] = image_path
+                                record(message_dict)
+                            else:
+                                await queue.put((message, message_dict, image_path))
+                        else:
+                            record(message_dict)
+
+                        # Optional delay between messages (reduces risk of rate limiting).
+                        if not rate_limiter and message_delay and message_delay > 0:
+                            await asyncio.sleep(message_delay)
+
+                    # Wait for the remaining downloads before closing the partition
+                    await queue.join()
+                finally:
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+
+                messages_writer.close()
+
+                if write_parquet:
+                    write_channel_messages_parquet(
+                        base_path=base_path,
+                        date_str=date_str,
+                        channel_name=channel_name,
+                        messages=iter_channel_messages(messages_writer.out_path),
+                    )
+
+                if high_water_marks is not None:
+                    high_water_marks[channel_name] = max(high_water_marks.get(channel_name, 0), newest_id)
+
+                if failed_downloads is not None:
+                    for message_id in downloaded | missing_ids:
+                        failed_downloads.pop(message_id, None)
+                    for message_id in download_failed:
+                        attempts = failed_downloads.get(message_id, 0) + 1
+                        if attempts >= MAX_DOWNLOAD_ATTEMPTS:
+                            failed_downloads.pop(message_id, None)
+                            logger.warning(f"Giving up on the photo of {channel} message {message_id}")
+                        else:
+                            failed_downloads[message_id] = attempts
+
+                logger.info(f"Finished scraping {channel}: {messages_writer.count} messages saved")
+
+                # Delay between channels (recommended).
+                if not rate_limiter and channel_delay and channel_delay > 0:
+                    await asyncio.sleep(channel_delay)
+
+                return messages_writer.count
+
+            except FloodWaitError as e:
+                # Telegram explicitly asks you to wait e.seconds
+                wait_seconds = int(getattr(e, "seconds", 0) or 0)
+                wait_seconds = max(wait_seconds, 1)
+                if rate_limiter:
+                    # Pause every task sharing the bucket, not just this channel.
+                    rate_limiter.on_flood_wait(wait_seconds)
+                    logger.warning(
+                        f"FloodWaitError for {channel}: pausing all channels {wait_seconds}s "
+                        f"(rate now {rate_limiter.rate:.2f} req/s)"
+                    )
+                else:
+                    logger.warning(f"FloodWaitError for {channel}: sleeping {wait_seconds}s")
+                    await asyncio.sleep(wait_seconds)
+                retries += 1
+                if retries > max_retries:
+                    kept = close_partial()
+                    logger.error(f"Too many FloodWait retries for {channel}. Skipping ({kept} messages kept).")
+                    return kept
+            except Exception as e:
+                kept = close_partial()
+                logger.error(f"Error scraping {channel}: {e} ({kept} messages kept)")
+                return kept
 
 
 async def scrape_all_channels(
@@ -219,6 +476,12 @@ async def scrape_all_channels(
     limit: int = 100,
     message_delay: float = DEFAULT_MESSAGE_DELAY,
     channel_delay: float = DEFAULT_CHANNEL_DELAY,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate_limiter: Optional[TokenBucket] = None,
+    download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+    incremental: bool = True,
+    write_parquet: bool = False,
+    date_str: Optional[str] = None,
 ) -> dict:
     """
     Scrape multiple Telegram channels and organize output.
@@ -228,16 +491,26 @@ async def scrape_all_channels(
         channels: List of channel usernames to scrape
         base_path: Base directory for all output (e.g., 'data')
         limit: Max messages per channel
+        concurrency: Number of channels scraped at once (1 = sequential)
+        rate_limiter: Token bucket shared by all channel tasks. Required
+            for concurrency > 1; one is built from the defaults if omitted.
+        download_workers: Parallel photo downloads per channel
+        incremental: Only fetch messages newer than each channel's stored
+            high-water mark (False re-fetches the newest `limit` messages)
+        write_parquet: Also write each partition as Parquet
+        date_str: Partition date (YYYY-MM-DD); defaults to today
     
     Returns:
         Dict with scraping statistics per channel
     """
+    date_str = date_str or today_str()
+
     await client.start()
     logger.info(f"Client authenticated. Scraping {len(channels)} channels...")
     
     # Setup output directories following challenge spec
-    csv_dir = os.path.join(base_path, "raw", "csv", TODAY)
-    json_dir = os.path.join(base_path, "raw", "telegram_messages", TODAY)
+    csv_dir = os.path.join(base_path, "raw", "csv", date_str)
+    json_dir = os.path.join(base_path, "raw", "telegram_messages", date_str)
     image_dir = os.path.join(base_path, "raw", "images")
     
     os.makedirs(csv_dir, exist_ok=True)
@@ -247,46 +520,86 @@ async def scrape_all_channels(
     # CSV file with all messages (useful for quick inspection)
     csv_file_path = os.path.join(csv_dir, "telegram_data.csv")
     stats = {}
-    
-    with open(csv_file_path, 'w', newline='', encoding='utf-8') as f:
+
+    # Per-channel last seen message_id, persisted across runs
+    high_water_marks = read_scrape_state(base_path)
+    # Per-channel photos that failed to download, retried on the next runs
+    failed_downloads = read_failed_downloads(base_path)
+
+    # Incremental runs on the same day append to the existing CSV
+    append_csv = incremental and os.path.exists(csv_file_path)
+
+    with open(csv_file_path, 'a' if append_csv else 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         # Header row matching challenge required fields
-        writer.writerow([
-            'message_id',
-            'channel_name', 
-            'channel_title',
-            'message_date',
-            'message_text',
-            'has_media',
-            'image_path',
-            'views',
-            'forwards'
-        ])
+        if not append_csv:
+            writer.writerow([
+                'message_id',
+                'channel_name', 
+                'channel_title',
+                'message_date',
+                'message_text',
+                'has_media',
+                'image_path',
+                'views',
+                'forwards'
+            ])
         
         channel_counts = {}
 
-        for channel in channels:
-            logger.info(f"Scraping {channel}...")
-            count = await scrape_channel(
-                client=client,
-                channel=channel,
-                writer=writer,
-                base_path=base_path,
-                date_str=TODAY,
-                limit=limit,
-                message_delay=message_delay,
-                channel_delay=channel_delay,
-            )
-            stats[channel] = count
-            channel_counts[channel.strip("@")] = count
+        if concurrency > 1 and rate_limiter is None:
+            rate_limiter = TokenBucket(rate=DEFAULT_RATE, burst=DEFAULT_BURST)
+
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def run_channel(channel: str) -> None:
+            async with semaphore:
+                logger.info(f"Scraping {channel}...")
+                count = await scrape_channel(
+                    client=client,
+                    channel=channel,
+                    writer=writer,
+                    base_path=base_path,
+                    date_str=date_str,
+                    limit=limit,
+                    message_delay=message_delay,
+                    channel_delay=channel_delay,
+                    rate_limiter=rate_limiter,
+                    download_workers=download_workers,
+                    min_id=high_water_marks.get(channel.strip("@"), 0) if incremental else 0,
+                    high_water_marks=high_water_marks,
+                    write_parquet=write_parquet,
+                    failed_downloads=failed_downloads.setdefault(channel.strip("@"), {}),
+                )
+                stats[channel] = count
+                channel_counts[channel.strip("@")] = count
+
+                # Save after every channel so a crash doesn't lose finished ones
+                write_scrape_state(
+                    base_path=base_path,
+                    high_water_marks=high_water_marks,
+                    failed_downloads=failed_downloads,
+                )
+
+        if concurrency > 1:
+            # All tasks share one event loop, so CSV rows never interleave.
+            await asyncio.gather(*(run_channel(channel) for channel in channels))
+        else:
+            for channel in channels:
+                await run_channel(channel)
 
         write_manifest(
             base_path=base_path,
-            date_str=TODAY,
+            date_str=date_str,
             channel_message_counts=channel_counts,
+            extra={
+                "incremental": incremental,
+                "high_water_marks": high_water_marks,
+            },
         )
     
-    # Log summary
+    # Log summary (keep the input channel order regardless of completion order)
+    stats = {channel: stats[channel] for channel in channels if channel in stats}
     total = sum(stats.values())
     logger.info(f"Scraping complete. Total messages: {total}")
     for ch, count in stats.items():
@@ -299,7 +612,17 @@ async def scrape_all_channels(
 # MAIN ENTRY POINT
 # =============================================================================
 
-if __name__ == "__main__":
+# Target channels from challenge document
+TARGET_CHANNELS = [
+    #'@cheMed123',           # CheMed - Medical products
+    #'@lobelia4cosmetics',   # Lobelia - Cosmetics and health products  
+    '@tikvahpharma',
+    '@tenamereja'       # Tikvah Pharma - Pharmaceuticals
+    # Add more channels from https://et.tgstat.com/medicine as needed
+]
+
+
+def main() -> None:
     parser = argparse.ArgumentParser(
         description="Telegram Scraper for Ethiopian Medical Channels",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -333,32 +656,81 @@ Examples:
         default=DEFAULT_CHANNEL_DELAY,
         help="Pause (seconds) after finishing a channel (default: 3)"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Channels to scrape at once; >1 replaces the fixed delays with "
+             "a shared rate limit (default: 1)"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help="Shared API budget in requests/second for concurrent mode (default: 1)"
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=DEFAULT_BURST,
+        help="Requests allowed back-to-back before the rate applies (default: 5)"
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DEFAULT_DOWNLOAD_WORKERS,
+        help="Photos downloaded in parallel per channel (default: 4)"
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Ignore stored high-water marks and re-fetch the newest --limit messages"
+    )
+    parser.add_argument(
+        "--parquet",
+        action="store_true",
+        help="Also write each partition as compressed Parquet (requires pyarrow)"
+    )
     args = parser.parse_args()
+
+    try:
+        api_id, api_hash = get_api_credentials()
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        print("Create a .env file with:")
+        print("  Tg_API_ID=your_api_id")
+        print("  Tg_API_HASH=your_api_hash")
+        sys.exit(1)
+
+    setup_logging()
     
     # Initialize Telegram client
     # Session file stores auth so you don't need to re-login each time
     client = TelegramClient("telegram_scraper_session", api_id, api_hash)
     logger.info("Telegram client initialized")
     
-    # Target channels from challenge document
-    target_channels = [
-        #'@cheMed123',           # CheMed - Medical products
-        #'@lobelia4cosmetics',   # Lobelia - Cosmetics and health products  
-        '@tikvahpharma',
-        '@tenamereja'       # Tikvah Pharma - Pharmaceuticals
-        # Add more channels from https://et.tgstat.com/medicine as needed
-    ]
-    
-    async def main() -> None:
+    async def run() -> None:
         # Python 3.14: prefer asyncio.run() with an async TelegramClient context.
         async with client:
             await scrape_all_channels(
                 client,
-                target_channels,
+                TARGET_CHANNELS,
                 args.path,
                 args.limit,
                 message_delay=args.message_delay,
                 channel_delay=args.channel_delay,
+                concurrency=args.concurrency,
+                rate_limiter=(
+                    TokenBucket(rate=args.rate, burst=args.burst)
+                    if args.concurrency > 1 else None
+                ),
+                download_workers=args.download_workers,
+                incremental=not args.full_refresh,
+                write_parquet=args.parquet,
             )
 
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
+import glob
 import json
 import os
+import shutil
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 
 def ensure_dir(path: str) -> None:
@@ -22,6 +24,254 @@ def channel_messages_json_path(base_path: str, date_str: str, channel_name: str)
     return os.path.join(partition_dir, f"{channel_name}.json")
 
 
+def channel_messages_jsonl_path(base_path: str, date_str: str, channel_name: str) -> str:
+    partition_dir = telegram_messages_partition_dir(base_path, date_str)
+    ensure_dir(partition_dir)
+    return os.path.join(partition_dir, f"{channel_name}.jsonl")
+
+
+class ChannelMessagesWriter:
+    """Stream messages for a (date, channel) partition to JSONL.
+
+    Records are buffered and written in batches of ``batch_size`` to a
+    ``.tmp`` file, which is atomically renamed to ``{channel}.jsonl`` on close.
+    ``close(commit=False)`` (or leaving the ``with`` block on an exception)
+    deletes the temp file instead, so the published partition is untouched.
+    With ``append=True`` the existing partition is copied into the temp file
+    first and new records are added after it.
+    """
+
+    def __init__(self, out_path: str, batch_size: int = 500, append: bool = False) -> None:
+        self.out_path = out_path
+        self.tmp_path = f"{out_path}.tmp"
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer: List[str] = []
+
+        if append and os.path.exists(out_path):
+            shutil.copyfile(out_path, self.tmp_path)
+            self._file = open(self.tmp_path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def write(self, message: Dict[str, Any]) -> None:
+        self._buffer.append(json.dumps(message, ensure_ascii=False, separators=(",", ":")))
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer = []
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def close(self, commit: bool = True) -> str:
+        """Publish the partition, or discard the temp file when ``commit`` is False."""
+        if self._file.closed:
+            return self.out_path
+        if not commit:
+            self._file.close()
+            os.remove(self.tmp_path)
+            return self.out_path
+        self.flush()
+        self._file.close()
+        os.replace(self.tmp_path, self.out_path)
+        return self.out_path
+
+    def __enter__(self) -> "ChannelMessagesWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(commit=exc_type is None)
+
+
+def open_channel_messages_writer(
+    *,
+    base_path: str,
+    date_str: str,
+    channel_name: str,
+    batch_size: int = 500,
+    append: bool = False,
+) -> ChannelMessagesWriter:
+    """Open a streaming JSONL writer for a (date, channel) partition."""
+
+    out_path = channel_messages_jsonl_path(base_path, date_str, channel_name)
+    return ChannelMessagesWriter(out_path, batch_size=batch_size, append=append)
+
+
+def iter_channel_messages(path: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield messages from a partition file: JSONL, Parquet or the older JSON array layout.
+
+    ``columns`` limits what is read from Parquet files (ignored for JSON).
+    """
+
+    if path.endswith(".parquet"):
+        pq = _require_pyarrow().parquet
+        table = pq.read_table(path, columns=columns)
+        for record in table.to_pylist():
+            # Keep the same dict shape the JSON layouts produce
+            if isinstance(record.get("message_date"), datetime):
+                record["message_date"] = record["message_date"].isoformat()
+            yield record
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+PARTITION_FORMATS = {
+    "json": (".jsonl", ".json"),
+    "parquet": (".parquet",),
+}
+
+
+def list_channel_message_files(
+    base_path: str,
+    file_format: str = "json",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    channels: Optional[Iterable[str]] = None,
+) -> List[str]:
+    """Channel partition files in the raw lake, skipping metadata files.
+
+    ``file_format="json"`` returns .jsonl and legacy .json files, ``"parquet"``
+    returns .parquet files. Partitions are pruned by directory/file name, so
+    files outside ``start_date``..``end_date`` (inclusive, YYYY-MM-DD) or not
+    in ``channels`` are never opened.
+    """
+
+    messages_dir = os.path.join(base_path, "raw", "telegram_messages")
+    wanted_channels = {c.strip("@") for c in channels} if channels else None
+
+    paths = []
+    for ext in PARTITION_FORMATS[file_format]:
+        for path in glob.glob(os.path.join(messages_dir, "*", f"*{ext}")):
+            date_str = os.path.basename(os.path.dirname(path))
+            channel_name, _ = os.path.splitext(os.path.basename(path))
+            if channel_name.startswith("_"):
+                continue
+            if start_date and date_str < start_date:
+                continue
+            if end_date and date_str > end_date:
+                continue
+            if wanted_channels is not None and channel_name not in wanted_channels:
+                continue
+            paths.append(path)
+    return sorted(paths)
+
+
+def partition_image_paths(base_path: str, date_str: str) -> List[str]:
+    """Downloaded photos referenced by a date partition's messages (deduplicated, sorted).
+
+    Images are stored per channel rather than per date, so the partition's
+    message files are the only record of which images belong to a day.
+    """
+
+    paths = set()
+    for path in list_channel_message_files(base_path, start_date=date_str, end_date=date_str):
+        for message in iter_channel_messages(path):
+            image_path = message.get("image_path")
+            if image_path and os.path.exists(image_path):
+                paths.add(image_path)
+    return sorted(paths)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet support requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _messages_arrow_schema(pa):
+    return pa.schema([
+        ("message_id", pa.int64()),
+        ("channel_name", pa.string()),
+        ("channel_title", pa.string()),
+        ("message_date", pa.timestamp("us", tz="UTC")),
+        ("message_text", pa.string()),
+        ("has_media", pa.bool_()),
+        ("image_path", pa.string()),
+        ("views", pa.int64()),
+        ("forwards", pa.int64()),
+    ])
+
+
+def channel_messages_parquet_path(base_path: str, date_str: str, channel_name: str) -> str:
+    partition_dir = telegram_messages_partition_dir(base_path, date_str)
+    ensure_dir(partition_dir)
+    return os.path.join(partition_dir, f"{channel_name}.parquet")
+
+
+def write_channel_messages_parquet(
+    *,
+    base_path: str,
+    date_str: str,
+    channel_name: str,
+    messages: Iterable[Dict[str, Any]],
+    compression: str = "zstd",
+) -> str:
+    """Write a (date, channel) partition as typed, compressed Parquet next to its JSONL file."""
+
+    pa = _require_pyarrow()
+    schema = _messages_arrow_schema(pa)
+
+    columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+    for message in messages:
+        for name in schema.names:
+            value = message.get(name)
+            if name == "message_date" and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            columns[name].append(value)
+
+    table = pa.Table.from_pydict(columns, schema=schema)
+
+    out_path = channel_messages_parquet_path(base_path, date_str, channel_name)
+    tmp_path = f"{out_path}.tmp"
+    pa.parquet.write_table(table, tmp_path, compression=compression)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def read_messages_parquet(
+    base_path: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    channels: Optional[Iterable[str]] = None,
+    columns: Optional[List[str]] = None,
+):
+    """Load Parquet partitions into one pyarrow Table.
+
+    Only partitions inside the date range / channel list are read, and only
+    ``columns`` are decoded. Use ``.to_pandas()`` on the result in notebooks.
+    """
+
+    pa = _require_pyarrow()
+    paths = list_channel_message_files(
+        base_path, file_format="parquet", start_date=start_date, end_date=end_date, channels=channels
+    )
+    schema = _messages_arrow_schema(pa)
+    if columns:
+        schema = pa.schema([schema.field(name) for name in columns])
+    if not paths:
+        return schema.empty_table()
+    return pa.concat_tables([pa.parquet.read_table(path, columns=columns) for path in paths])
+
+
 def write_channel_messages_json(
     *,
     base_path: str,
@@ -65,3 +315,76 @@ def write_manifest(
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
     return out_path
+
+
+def read_channel_messages_json(base_path: str, date_str: str, channel_name: str) -> List[Dict[str, Any]]:
+    """Read a (date, channel) partition back; returns [] if it doesn't exist yet.
+
+    Prefers the JSONL layout and falls back to the older ``{channel}.json``.
+    """
+
+    partition_dir = telegram_messages_partition_dir(base_path, date_str)
+    for ext in ("jsonl", "json"):
+        path = os.path.join(partition_dir, f"{channel_name}.{ext}")
+        if os.path.exists(path):
+            return list(iter_channel_messages(path))
+    return []
+
+
+def scrape_state_path(base_path: str) -> str:
+    """State lives at the root of the messages lake, beside the daily partitions."""
+
+    messages_dir = os.path.join(base_path, "raw", "telegram_messages")
+    ensure_dir(messages_dir)
+    return os.path.join(messages_dir, "_scrape_state.json")
+
+
+def read_scrape_state(base_path: str) -> Dict[str, int]:
+    """Return the last scraped message_id per channel ({} on first run)."""
+
+    path = scrape_state_path(base_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return {channel: int(message_id) for channel, message_id in payload.get("channels", {}).items()}
+
+
+def read_failed_downloads(base_path: str) -> Dict[str, Dict[int, int]]:
+    """Return {channel: {message_id: attempts}} for photos still to be retried."""
+
+    path = scrape_state_path(base_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return {
+        channel: {int(message_id): int(attempts) for message_id, attempts in failed.items()}
+        for channel, failed in payload.get("failed_downloads", {}).items()
+    }
+
+
+def write_scrape_state(
+    *,
+    base_path: str,
+    high_water_marks: Dict[str, int],
+    failed_downloads: Optional[Dict[str, Dict[int, int]]] = None,
+) -> str:
+    """Persist per-channel high-water marks and failed photo downloads (written atomically)."""
+
+    payload = {
+        "updated_utc": datetime.now(timezone.utc).isoformat(),
+        "channels": high_water_marks,
+        # JSON keys are strings; channels with nothing left to retry are omitted
+        "failed_downloads": {
+            channel: {str(message_id): attempts for message_id, attempts in failed.items()}
+            for channel, failed in (failed_downloads or {}).items()
+            if failed
+        },
+    }
+    out_path = scrape_state_path(base_path)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, out_path)
+    return out_path
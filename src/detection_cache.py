@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Sequence
+
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_cache_key(model_path: str) -> str:
+    """Identify a model by name and weights content, so new weights get a new key.
+
+    Names ultralytics downloads on first use (e.g. 'yolov8n.pt' before it
+    exists locally) fall back to the name alone.
+    """
+
+    name = os.path.basename(model_path)
+    if os.path.isfile(model_path):
+        return f"{name}:{file_content_hash(model_path)[:16]}"
+    return name
+
+
+class DetectionCache:
+    """On-disk SQLite cache of model output keyed by (image content hash, model key).
+
+    Each entry stores an image's detections as a JSON list of
+    [detected_class, confidence, x1, y1, x2, y2]. An image with no
+    detections is cached as []. ``variant`` (e.g. the inference backend)
+    keeps separate entries for the same weights, stored under
+    ``{model_key}:{variant}``. When the cache is opened for different
+    weights, entries for other models are dropped unless keep_other_models
+    is set; other variants of the same weights are kept.
+    """
+
+    def __init__(
+        self, path: str, model_key: str, variant: str = "", keep_other_models: bool = False
+    ) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.model_key = f"{model_key}:{variant}" if variant else model_key
+        self.hits = 0
+        self.misses = 0
+
+        # Concurrent partition runs share the file; wait for their writes instead of failing
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS detection_cache (
+                content_hash TEXT NOT NULL,
+                model_key TEXT NOT NULL,
+                detections TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (content_hash, model_key)
+            )
+            """
+        )
+        if not keep_other_models:
+            prefix = f"{model_key}:"
+            self._conn.execute(
+                "DELETE FROM detection_cache WHERE model_key != ? AND substr(model_key, 1, ?) != ?",
+                (model_key, len(prefix), prefix),
+            )
+        self._conn.commit()
+
+    def get_many(self, content_hashes: Iterable[str]) -> Dict[str, List[list]]:
+        hashes = list(set(content_hashes))
+        found: Dict[str, List[list]] = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT content_hash, detections FROM detection_cache "
+                f"WHERE model_key = ? AND content_hash IN ({placeholders})",
+                [self.model_key, *chunk],
+            )
+            for content_hash, detections in rows:
+                found[content_hash] = json.loads(detections)
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, entries: Dict[str, Sequence[Sequence]]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO detection_cache (content_hash, model_key, detections) VALUES (?, ?, ?)",
+            [(h, self.model_key, json.dumps([list(d) for d in dets])) for h, dets in entries.items()],
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "DetectionCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
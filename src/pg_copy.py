@@ -0,0 +1,29 @@
+import io
+from typing import Any, Iterable, Sequence, Tuple
+
+
+def copy_value(value: Any) -> str:
+    """Format one field for COPY ... (FORMAT csv).
+
+    COPY reads an unquoted empty field as NULL and a quoted "" as an empty
+    string, so every string is quoted and None is left empty.
+    """
+
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def rows_to_copy_buffer(rows: Iterable[Sequence[Any]]) -> Tuple[io.StringIO, int]:
+    """Render rows into an in-memory CSV buffer for cursor.copy_expert()."""
+
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write(",".join(copy_value(v) for v in row))
+        buffer.write("\n")
+        count += 1
+    buffer.seek(0)
+    return buffer, count
@@ -0,0 +1,57 @@
+"""Secondary indexes for the raw schema.
+
+Created by the schema setup in scripts/loader.py and src/yolo_detect.py,
+so existing databases pick up new ones on the next run. Only missing
+indexes are created: CREATE INDEX takes a SHARE lock on the table before
+IF NOT EXISTS is checked, which would queue every setup behind concurrent
+loads. The marts get theirs from dbt post-hooks (macros/indexes.sql).
+"""
+from typing import Collection, Dict, Iterable, Iterator, List, Set, Tuple
+
+# table -> [(index name, access method, column list)]
+RAW_INDEXES: Dict[str, List[Tuple[str, str, str]]] = {
+    "telegram_messages": [
+        # Per-channel activity and date-range queries (API, dbt per-channel stats)
+        ("telegram_messages_channel_date_idx", "btree", "(channel_name, date)"),
+        # Joins from image_categories / yolo_detections by message_id
+        ("telegram_messages_message_id_idx", "btree", "(message_id)"),
+        # Full-text search on the generated message_tsv column
+        ("telegram_messages_message_tsv_gin", "gin", "(message_tsv)"),
+        # Rows arrive roughly in date / ingestion order, so BRIN summaries a few
+        # pages in size serve range scans, e.g. the dbt ingested_at watermarks
+        ("telegram_messages_date_brin", "brin", "(date)"),
+        ("telegram_messages_ingested_at_brin", "brin", "(ingested_at)"),
+    ],
+    "yolo_detections": [
+        # DetectionSink replaces an image's detections by image_path
+        ("yolo_detections_image_path_idx", "btree", "(image_path)"),
+        ("yolo_detections_channel_message_idx", "btree", "(channel_name, message_id)"),
+        ("yolo_detections_detection_date_brin", "brin", "(detection_date)"),
+    ],
+    "image_categories": [
+        ("image_categories_channel_message_idx", "btree", "(channel_name, message_id)"),
+        ("image_categories_processed_date_brin", "brin", "(processed_date)"),
+    ],
+}
+
+
+def index_statements(
+    tables: Iterable[str], schema: str = "raw", existing: Collection[str] = ()
+) -> Iterator[str]:
+    """CREATE INDEX statements for the tables' managed indexes not in existing."""
+    for table in tables:
+        for name, method, columns in RAW_INDEXES[table]:
+            if name not in existing:
+                yield f"CREATE INDEX IF NOT EXISTS {name} ON {schema}.{table} USING {method} {columns};"
+
+
+def existing_indexes(cur, schema: str = "raw") -> Set[str]:
+    """Names of the indexes in schema (a catalog read, no table locks)."""
+    cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s;", (schema,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def create_indexes(cur, tables: Iterable[str], schema: str = "raw") -> None:
+    """Create the managed indexes missing from tables (the caller commits)."""
+    for statement in index_statements(tables, schema, existing=existing_indexes(cur, schema)):
+        cur.execute(statement)
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter shared by concurrent scraping tasks.
+
+    Every Telegram API request takes one token: an entity lookup, a history
+    page (up to 100 messages) or a media download.
+    Tokens refill at ``rate`` per second up to ``burst``. When Telegram answers
+    with a FloodWait, ``on_flood_wait`` pauses *all* callers for the requested
+    time and cuts the refill rate, which then recovers slowly as calls succeed.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        min_rate: float = 0.05,
+        decrease_factor: float = 0.5,
+        recovery_step: float = 0.01,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(int(burst), 1)
+        self.min_rate = min(min_rate, rate)
+        self.decrease_factor = decrease_factor
+        self.recovery_step = recovery_step
+        self.flood_waits = 0
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available (and no FloodWait pause is active)."""
+
+        # Created lazily so the bucket can be built outside a running loop.
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # Holding the lock while sleeping keeps callers in FIFO order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.rate = min(self.max_rate, self.rate + self.recovery_step)
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_flood_wait(self, seconds: float) -> None:
+        """Back off every task for ``seconds`` and lower the refill rate."""
+
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + max(seconds, 0))
+        self._tokens = 0.0
+        self._updated = max(now, self._blocked_until)
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.flood_waits += 1
@@ -1,12 +1,31 @@
 import os
+import csv
+import sys
 import glob
-import pandas as pd
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import numpy as np
 import psycopg2
-from ultralytics import YOLO
+from pathlib import Path
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
+# Allow running this file directly so `import src.*` works
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.detection_cache import DetectionCache, file_content_hash, model_cache_key
+from src.pg_copy import rows_to_copy_buffer
+from src.pg_indexes import create_indexes
+
 load_dotenv()
 
+# Model output cache (keyed by image content hash + model weights)
+DEFAULT_CACHE_PATH = 'data/processed/detection_cache.sqlite'
+
 # Database connection details
 DB_HOST = os.getenv('DB_HOST', 'localhost')
 DB_PORT = os.getenv('DB_PORT', '5432')
@@ -25,6 +44,10 @@ def get_db_connection():
 
 def create_detection_table(conn):
     with conn.cursor() as cur:
+        # Runs in parallel with the loader's setup, so take the same lock and
+        # don't rely on it having created the schema
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('raw_schema_setup'));")
+        cur.execute("CREATE SCHEMA IF NOT EXISTS raw;")
         # Create detections table with message_id and channel_name
         cur.execute("""
             CREATE TABLE IF NOT EXISTS raw.yolo_detections (
@@ -51,13 +74,70 @@ def create_detection_table(conn):
                 processed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
         """)
+        # Images already run through the model, to skip them on the next run
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS raw.processed_images (
+                image_path TEXT PRIMARY KEY,
+                file_size BIGINT,
+                file_mtime DOUBLE PRECISION,
+                processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        create_indexes(cur, ["yolo_detections", "image_categories"])
         conn.commit()
 
-def classify_detections(detections_list):
+def get_processed_images(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT image_path, file_size, file_mtime FROM raw.processed_images;")
+        return {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+def image_signature(img_path):
+    stat = os.stat(img_path)
+    return stat.st_size, stat.st_mtime
+
+def select_new_images(image_paths, processed):
+    """Keep images that are new or whose size/mtime changed since they were processed."""
+    return [p for p in image_paths if processed.get(p) != image_signature(p)]
+
+DETECTION_COLUMNS = ('image_path', 'message_id', 'channel_name', 'detected_class',
+                     'confidence', 'x1', 'y1', 'x2', 'y2')
+CATEGORY_COLUMNS = ('message_id', 'channel_name', 'image_path', 'category')
+
+def concat_detection_columns(batches):
+    if not batches:
+        return empty_detection_columns()
+    return {col: np.concatenate([b[col] for b in batches]) for col in DETECTION_COLUMNS}
+
+def empty_detection_columns():
+    return {col: np.empty(0, dtype=object) for col in DETECTION_COLUMNS}
+
+def detection_count(columns):
+    return len(columns['confidence'])
+
+def detection_rows(columns):
+    """Row tuples (in DETECTION_COLUMNS order) from a columnar detection batch."""
+    return zip(*(np.asarray(columns[col]).tolist() for col in DETECTION_COLUMNS))
+
+def detections_to_records(columns):
+    return [dict(zip(DETECTION_COLUMNS, row)) for row in detection_rows(columns)]
+
+def records_to_detection_columns(detections):
+    if not detections:
+        return empty_detection_columns()
+    return {col: np.array([d[col] for d in detections], dtype=object) for col in DETECTION_COLUMNS}
+
+def classify_detections(detected_classes):
     """
     Explicit categorization logic.
+    Takes the class names detected in one image (any iterable, e.g. a slice
+    of a detected_class array); detection dicts are accepted too.
     """
-    classes = set(d['detected_class'] for d in detections_list if d['detected_class'])
+    classes = set(
+        d['detected_class'] if isinstance(d, dict) else d
+        for d in detected_classes
+    )
+    classes.discard(None)
+    classes.discard('')
     
     if 'person' in classes and ('bottle' in classes or 'cup' in classes): # Expanded logic example
         return 'promotional'
@@ -70,116 +150,648 @@ def classify_detections(detections_list):
     else:
         return 'miscellaneous'
 
-def run_detection(model_path='yolov8n.pt', images_dir='data/raw/images'):
-    model = YOLO(model_path)
-    
-    # Recursively find all jpg images
-    image_paths = glob.glob(os.path.join(images_dir, '**', '*.jpg'), recursive=True)
-    
-    all_detections = []
-    image_categories = []
-    
-    print(f"Found {len(image_paths)} images to process.")
-    
-    for img_path in image_paths:
-        try:
-            # Extract metadata from path
-            # Expected format: data/raw/images/{channel_name}/{message_id}.jpg
-            parts = img_path.split(os.sep)
-            if len(parts) >= 2:
-                channel_name = parts[-2]
-                filename = parts[-1]
-                try:
-                    message_id = int(filename.split('.')[0])
-                except ValueError:
-                    print(f"Skipping {img_path}: Filename is not a valid message_id")
-                    continue
-            else:
-                print(f"Skipping {img_path}: path structure unknown")
+def parse_image_path(img_path):
+    """
+    Extract (channel_name, message_id) from an image path.
+    Expected format: data/raw/images/{channel_name}/{message_id}.jpg
+    Returns None (after printing why) if the path doesn't match.
+    """
+    parts = img_path.split(os.sep)
+    if len(parts) < 2:
+        print(f"Skipping {img_path}: path structure unknown")
+        return None
+    channel_name = parts[-2]
+    filename = parts[-1]
+    try:
+        message_id = int(filename.split('.')[0])
+    except ValueError:
+        print(f"Skipping {img_path}: Filename is not a valid message_id")
+        return None
+    return channel_name, message_id
+
+def iter_decoded_images(image_paths, prefetch_workers=2, prefetch_size=64):
+    """
+    Yield (img_path, image) in order, decoding up to prefetch_size images ahead
+    on worker threads while the caller runs inference.
+    Images are read with cv2.imread, exactly as ultralytics reads a path.
+    """
+    import cv2
+
+    with ThreadPoolExecutor(max_workers=prefetch_workers) as pool:
+        pending = deque()
+        paths = iter(image_paths)
+        for img_path in paths:
+            pending.append((img_path, pool.submit(cv2.imread, img_path)))
+            if len(pending) >= prefetch_size:
+                break
+        while pending:
+            img_path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(cv2.imread, next_path)))
+            image = future.result()
+            if image is None:
+                print(f"Error processing {img_path}: could not decode image")
                 continue
+            yield img_path, image
 
-            results = model(img_path, verbose=False)
-            
-            current_image_detections = []
+# Images iter_shape_batches may hold in partial buckets, in batches
+SHAPE_BUFFER_BATCHES = 4
 
-            # If no detections
-            if not results or len(results[0].boxes) == 0:
+def iter_shape_batches(decoded_images, batch_size, max_buffered=None):
+    """
+    Group decoded images into batches of identical shape.
+    Ultralytics letterboxes a mixed-shape batch differently from a single
+    image, so same-shape batches keep results identical to per-image calls.
+    At most max_buffered images (default batch_size * SHAPE_BUFFER_BATCHES)
+    wait in partial buckets: past that, the oldest bucket is flushed as a
+    short batch, so rare shapes don't pile up until the stream ends.
+    """
+    if max_buffered is None:
+        max_buffered = batch_size * SHAPE_BUFFER_BATCHES
+    buckets = {}  # shape -> images, in order of each bucket's first image
+    buffered = 0
+    for img_path, image in decoded_images:
+        bucket = buckets.setdefault(image.shape, [])
+        bucket.append((img_path, image))
+        buffered += 1
+        if len(bucket) >= batch_size:
+            buffered -= len(bucket)
+            yield buckets.pop(image.shape)
+        elif buffered > max_buffered:
+            oldest = buckets.pop(next(iter(buckets)))
+            buffered -= len(oldest)
+            yield oldest
+    yield from buckets.values()
+
+def detect_images(model, metadata, batch_size=16, prefetch_workers=2):
+    """
+    Run the model over images in batches.
+    metadata maps img_path -> (channel_name, message_id).
+    Yields (detections, categories) for each inference batch, where
+    detections is columnar: {column: array} over DETECTION_COLUMNS.
+    """
+    # Index class ids straight into names with one array lookup
+    class_names = np.array([model.names[i] for i in range(len(model.names))], dtype=object)
+    decoded = iter_decoded_images(
+        list(metadata), prefetch_workers=prefetch_workers, prefetch_size=batch_size * 2
+    )
+    for batch in iter_shape_batches(decoded, batch_size):
+        batch_paths = [img_path for img_path, _ in batch]
+        try:
+            results = model([image for _, image in batch], verbose=False)
+        except Exception as e:
+            print(f"Error processing batch starting at {batch_paths[0]}: {e}")
+            continue
+
+        # Pull boxes out as whole arrays per batch instead of box by box
+        counts = np.array([len(result.boxes) for result in results], dtype=np.int64)
+        image_idx = np.repeat(np.arange(len(results)), counts)
+        if counts.sum():
+            cls_ids = np.concatenate([result.boxes.cls.cpu().numpy() for result in results]).astype(np.int64)
+            confs = np.concatenate([result.boxes.conf.cpu().numpy() for result in results])
+            xyxy = np.concatenate([result.boxes.xyxy.cpu().numpy() for result in results])
+        else:
+            cls_ids = np.empty(0, dtype=np.int64)
+            confs = np.empty(0, dtype=np.float32)
+            xyxy = np.empty((0, 4), dtype=np.float32)
+
+        paths_arr = np.array(batch_paths, dtype=object)
+        channels_arr = np.array([metadata[p][0] for p in batch_paths], dtype=object)
+        message_ids_arr = np.array([metadata[p][1] for p in batch_paths], dtype=np.int64)
+
+        batch_detections = {
+            'image_path': paths_arr[image_idx],
+            'message_id': message_ids_arr[image_idx],
+            'channel_name': channels_arr[image_idx],
+            'detected_class': class_names[cls_ids],
+            'confidence': confs,
+            'x1': xyxy[:, 0],
+            'y1': xyxy[:, 1],
+            'x2': xyxy[:, 2],
+            'y2': xyxy[:, 3],
+        }
+
+        # Classify each image from its slice of the class-name column
+        batch_categories = []
+        ends = np.cumsum(counts)
+        for i, img_path in enumerate(batch_paths):
+            if counts[i] == 0:
                 print(f"No detections for {img_path}")
-                # We still might want to categorize it as 'no_content'
-                pass
-            else:
-                for result in results:
-                    for box in result.boxes:
-                        cls_id = int(box.cls[0])
-                        class_name = model.names[cls_id]
-                        conf = float(box.conf[0])
-                        xyxy = box.xyxy[0].tolist()
-                        
-                        det = {
-                            'image_path': img_path,
-                            'message_id': message_id,
-                            'channel_name': channel_name,
-                            'detected_class': class_name,
-                            'confidence': conf,
-                            'x1': xyxy[0],
-                            'y1': xyxy[1],
-                            'x2': xyxy[2],
-                            'y2': xyxy[3]
-                        }
-                        current_image_detections.append(det)
-                        all_detections.append(det)
-
-            # Classify image
-            category = classify_detections(current_image_detections)
-            image_categories.append({
+            channel_name, message_id = metadata[img_path]
+            batch_categories.append({
                 'message_id': message_id,
                 'channel_name': channel_name,
                 'image_path': img_path,
-                'category': category
+                'category': classify_detections(batch_detections['detected_class'][ends[i] - counts[i]:ends[i]])
             })
-            
-        except Exception as e:
-            print(f"Error processing {img_path}: {e}")
 
-    return all_detections, image_categories
+        yield batch_detections, batch_categories
 
-def save_to_db(detections, categories):
-    conn = get_db_connection()
-    create_detection_table(conn)
+# --- Inference backends ---
+# Exported models are cached next to the PyTorch weights and reused until the
+# weights change. The onnx / onnxruntime / openvino packages come from
+# requirements.txt (ultralytics would otherwise pip-install them at runtime).
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+def exported_model_path(model_path, backend):
+    stem = os.path.splitext(model_path)[0]
+    if backend == 'onnx':
+        return f"{stem}.onnx"
+    if backend == 'openvino':
+        return f"{stem}_openvino_model"
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+def resolve_model(model_path, backend='torch'):
+    """
+    Return the model file/directory to load for a backend, exporting the
+    PyTorch weights (with a dynamic batch axis) on first use.
+    """
+    if backend == 'torch':
+        return model_path
+
+    exported = exported_model_path(model_path, backend)
+    if os.path.exists(exported) and (
+        not os.path.exists(model_path) or os.path.getmtime(exported) >= os.path.getmtime(model_path)
+    ):
+        return exported
+
+    from ultralytics import YOLO
+
+    print(f"Exporting {model_path} to {backend} (one-time)...")
+    exported = YOLO(model_path).export(format=backend, dynamic=True)
+    return str(exported)
+
+def load_model(path):
+    # ultralytics pulls in torch; import it only when a model is actually needed
+    from ultralytics import YOLO
+    # task is needed for exported formats, which don't carry it like .pt does
+    return YOLO(path, task='detect')
+
+# Models loaded in this process, by path, so repeated calls within one
+# process (the CLI, a Dagster step) load the weights only once.
+_loaded_models = {}
+
+def get_model(path):
+    """load_model, memoized per process."""
+    if path not in _loaded_models:
+        _loaded_models[path] = load_model(path)
+    return _loaded_models[path]
+
+def confidences_by_class(detections):
+    """{class name: sorted confidences} for (class name, confidence) pairs."""
+    per_class = {}
+    for name, conf in detections:
+        per_class.setdefault(name, []).append(conf)
+    return {name: sorted(values) for name, values in per_class.items()}
+
+def compare_detections(expected, actual, conf_tol=0.02):
+    """
+    Compare one image's (class name, confidence) detections from two backends.
+    The detected classes must match and, class by class, the sorted
+    confidences must agree within conf_tol. Returns a list of mismatch
+    descriptions (empty when they agree).
+    """
+    expected, actual = confidences_by_class(expected), confidences_by_class(actual)
+    if expected.keys() != actual.keys():
+        return [f"classes {sorted(expected)} vs {sorted(actual)}"]
+    mismatches = []
+    for name in expected:
+        if len(expected[name]) != len(actual[name]) or np.abs(
+            np.array(expected[name]) - np.array(actual[name])
+        ).max(initial=0) > conf_tol:
+            mismatches.append(f"{name} confidences {expected[name]} vs {actual[name]}")
+    return mismatches
+
+def check_backend_parity(model_path, backend, image_paths, conf_tol=0.02):
+    """
+    Compare a backend against PyTorch on sample images (see compare_detections).
+    Returns a list of mismatch descriptions (empty when the backends agree).
+    """
+    import cv2
+
+    reference = load_model(model_path)
+    candidate = load_model(resolve_model(model_path, backend))
+    mismatches = []
+
+    for img_path in image_paths:
+        image = cv2.imread(img_path)
+        if image is None:
+            continue
+        outputs = []
+        for model in (reference, candidate):
+            boxes = model(image, verbose=False)[0].boxes
+            classes = boxes.cls.cpu().numpy().astype(np.int64)
+            confs = boxes.conf.cpu().numpy()
+            outputs.append([(model.names[cls_id], conf) for cls_id, conf in zip(classes.tolist(), confs.tolist())])
+        mismatches.extend(f"{img_path}: {m}" for m in compare_detections(*outputs, conf_tol=conf_tol))
+
+    return mismatches
+
+# --- Multi-process workers ---
+# Each worker process loads its own model once (in the pool initializer).
+_worker_model = None
+
+def limit_runtime_threads(model, path, threads):
+    """
+    Cap the intra-op threads of an exported model's runtime.
+    ultralytics builds the ONNX Runtime session / OpenVINO compiled model
+    with the runtime's defaults (one thread per core) when the model first
+    predicts, so a warm-up call creates them and they are rebuilt here with
+    an explicit thread count (ultralytics' AutoBackend keeps them as
+    session / core, ov_model, ov_compiled_model). PyTorch models are covered
+    by set_num_threads.
+    """
+    model(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+    backend = model.predictor.model
+    if getattr(backend, 'onnx', False):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        backend.session = onnxruntime.InferenceSession(
+            path, sess_options=options, providers=backend.session.get_providers()
+        )
+    elif getattr(backend, 'xml', False):
+        backend.ov_compiled_model = backend.core.compile_model(
+            backend.ov_model,
+            device_name='CPU',
+            config={'PERFORMANCE_HINT': backend.inference_mode, 'INFERENCE_NUM_THREADS': threads},
+        )
+
+def _init_worker(model_path, threads):
+    global _worker_model
+    import torch
+    # Split the cores between workers instead of every process using all of
+    # them: torch for the .pt model and pre/post-processing, the runtime's own
+    # thread pool for exported models
+    torch.set_num_threads(threads)
+    _worker_model = load_model(model_path)
+    if not model_path.endswith('.pt'):
+        limit_runtime_threads(_worker_model, model_path, threads)
+
+def _detect_shard(shard, batch_size):
+    batches = []
+    categories = []
+    for batch_detections, batch_categories in detect_images(
+        _worker_model, dict(shard), batch_size=batch_size, prefetch_workers=1
+    ):
+        batches.append(batch_detections)
+        categories.extend(batch_categories)
+    return concat_detection_columns(batches), categories
+
+# Detection shards submitted per worker in iter_detection_results: one
+# running plus one queued, so a worker never idles waiting for the parent.
+SHARDS_IN_FLIGHT_PER_WORKER = 2
+
+def iter_detection_results(model_path, metadata, batch_size=16, prefetch_workers=2, workers=1):
+    """
+    Yield (detections, categories) chunks as they finish.
+    With workers > 1 the images are sharded across a process pool and each
+    shard's results are streamed back to this (parent) process.
+    """
+    if workers <= 1:
+        model = get_model(model_path)
+        yield from detect_images(model, metadata, batch_size=batch_size, prefetch_workers=prefetch_workers)
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    items = list(metadata.items())
+    # Small shards keep results flowing back and balance uneven workers
+    shard_size = batch_size * 4
+    shards = (items[i:i + shard_size] for i in range(0, len(items), shard_size))
+    # Shards are submitted as results are consumed, so at most this many
+    # shards' results are held at once however large the archive is
+    max_in_flight = workers * SHARDS_IN_FLIGHT_PER_WORKER
+
+    # spawn: forking a process that has already imported torch can deadlock
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_path, threads),
+    ) as pool:
+        in_flight = set()
+        while True:
+            while len(in_flight) < max_in_flight:
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                in_flight.add(pool.submit(_detect_shard, shard, batch_size))
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def find_images_to_process(images_dir='data/raw/images', incremental=True, conn=None, image_paths=None):
+    """
+    Return {img_path: (channel_name, message_id)} for the images to run.
+    image_paths restricts the run to those files (e.g. one date partition's
+    images) instead of everything under images_dir. Incremental runs drop
+    images already recorded in raw.processed_images (read over conn, or a
+    new connection when conn is None).
+    """
+    if image_paths is None:
+        # Recursively find all jpg images
+        image_paths = glob.glob(os.path.join(images_dir, '**', '*.jpg'), recursive=True)
+    else:
+        image_paths = list(image_paths)
+
+    if incremental:
+        own_conn = conn is None
+        if own_conn:
+            conn = get_db_connection()
+        create_detection_table(conn)
+        processed = get_processed_images(conn)
+        if own_conn:
+            conn.close()
+        found = len(image_paths)
+        image_paths = select_new_images(image_paths, processed)
+        print(f"Found {found} images, {found - len(image_paths)} already processed.")
     
-    with conn.cursor() as cur:
-        # Save detections
-        if detections:
-            args_list = [
-                (d['image_path'], d['message_id'], d['channel_name'], d['detected_class'], 
-                 d['confidence'], d['x1'], d['y1'], d['x2'], d['y2']) 
-                for d in detections
-            ]
-            # Use executemany for bulk insert
-            cur.executemany("""
-                INSERT INTO raw.yolo_detections 
-                (image_path, message_id, channel_name, detected_class, confidence, x1, y1, x2, y2)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, args_list)
-        
-        # Save categories (Upsert to handle re-runs)
-        if categories:
-            args_list_cat = [
-                (c['message_id'], c['channel_name'], c['image_path'], c['category'])
-                for c in categories
-            ]
-            cur.executemany("""
+    print(f"Found {len(image_paths)} images to process.")
+
+    # Skip paths we can't map back to a message before decoding anything
+    metadata = {}
+    for img_path in image_paths:
+        parsed = parse_image_path(img_path)
+        if parsed:
+            metadata[img_path] = parsed
+    return metadata
+
+def results_from_cache(paths, hashes, cached, metadata):
+    """Build a (detections, categories) chunk for images whose model output is cached."""
+    records = []
+    categories = []
+    for img_path in paths:
+        channel_name, message_id = metadata[img_path]
+        image_detections = cached[hashes[img_path]]
+        for detected_class, confidence, x1, y1, x2, y2 in image_detections:
+            records.append({
+                'image_path': img_path,
+                'message_id': message_id,
+                'channel_name': channel_name,
+                'detected_class': detected_class,
+                'confidence': confidence,
+                'x1': x1,
+                'y1': y1,
+                'x2': x2,
+                'y2': y2
+            })
+        categories.append({
+            'message_id': message_id,
+            'channel_name': channel_name,
+            'image_path': img_path,
+            'category': classify_detections(d[0] for d in image_detections)
+        })
+    return records_to_detection_columns(records), categories
+
+def iter_cached_detection_results(model_path, metadata, cache, batch_size=16, prefetch_workers=2, workers=1):
+    """
+    iter_detection_results with a content-hash cache in front of the model.
+    Images whose bytes are already cached for this model skip inference, and
+    identical images within the run (reposts) are inferred only once.
+    """
+    hashes = {img_path: file_content_hash(img_path) for img_path in metadata}
+    cached = cache.get_many(hashes.values())
+
+    hit_paths = [p for p in metadata if hashes[p] in cached]
+    chunk = batch_size * 4
+    for i in range(0, len(hit_paths), chunk):
+        yield results_from_cache(hit_paths[i:i + chunk], hashes, cached, metadata)
+
+    # One representative per uncached content hash; copies reuse its output
+    representatives = {}
+    copies = {}
+    for img_path in metadata:
+        content_hash = hashes[img_path]
+        if content_hash in cached:
+            continue
+        if content_hash in representatives:
+            copies.setdefault(content_hash, []).append(img_path)
+        else:
+            representatives[content_hash] = img_path
+
+    print(f"Detection cache: {len(hit_paths)} cached, {sum(map(len, copies.values()))} duplicate copies, "
+          f"{len(representatives)} images to run.")
+
+    to_run = {p: metadata[p] for p in representatives.values()}
+    for detections, categories in iter_detection_results(
+        model_path, to_run, batch_size=batch_size, prefetch_workers=prefetch_workers, workers=workers
+    ):
+        # Group this chunk's rows by image to store one cache entry per image
+        per_image = {c['image_path']: [] for c in categories}
+        for row in detection_rows(detections):
+            record = dict(zip(DETECTION_COLUMNS, row))
+            per_image[record['image_path']].append([
+                record['detected_class'], record['confidence'],
+                record['x1'], record['y1'], record['x2'], record['y2'],
+            ])
+        new_entries = {hashes[p]: rows for p, rows in per_image.items()}
+        cache.put_many(new_entries)
+        yield detections, categories
+
+        copy_paths = [p for h in new_entries for p in copies.get(h, [])]
+        if copy_paths:
+            yield results_from_cache(copy_paths, hashes, new_entries, metadata)
+
+def iter_detections(model_path='yolov8n.pt', images_dir='data/raw/images', batch_size=16, prefetch_workers=2,
+                    incremental=True, workers=1, cache_path=DEFAULT_CACHE_PATH, backend='torch', conn=None,
+                    image_paths=None):
+    """
+    Generator form of run_detection: yields (detections, categories) per finished batch/shard.
+    cache_path=None disables the detection cache. backend is one of BACKENDS.
+    """
+    metadata = find_images_to_process(images_dir, incremental=incremental, conn=conn, image_paths=image_paths)
+    runtime_path = resolve_model(model_path, backend)
+    if not cache_path:
+        yield from iter_detection_results(
+            runtime_path, metadata, batch_size=batch_size, prefetch_workers=prefetch_workers, workers=workers
+        )
+        return
+
+    # Backends agree only within tolerance, so each keeps its own cache entries
+    with DetectionCache(cache_path, model_cache_key(model_path), variant=backend) as cache:
+        yield from iter_cached_detection_results(
+            runtime_path, metadata, cache, batch_size=batch_size, prefetch_workers=prefetch_workers, workers=workers
+        )
+
+def run_detection(model_path='yolov8n.pt', images_dir='data/raw/images', batch_size=16, prefetch_workers=2,
+                  incremental=True, workers=1, cache_path=DEFAULT_CACHE_PATH, backend='torch'):
+    all_detections = []
+    image_categories = []
+
+    for detections, categories in iter_detections(
+        model_path, images_dir, batch_size=batch_size, prefetch_workers=prefetch_workers,
+        incremental=incremental, workers=workers, cache_path=cache_path, backend=backend
+    ):
+        all_detections.extend(detections_to_records(detections))
+        image_categories.extend(categories)
+
+    return all_detections, image_categories
+
+class DetectionSink:
+    """
+    Write detection results in fixed-size chunks as they are produced.
+
+    Each flush replaces the chunk's images in raw.yolo_detections (via COPY),
+    upserts raw.image_categories, marks the images in raw.processed_images
+    and commits, so an interrupted run resumes from the last chunk. When
+    csv_dir is set, the same rows are appended to the CSV exports.
+    """
+
+    def __init__(self, conn, chunk_size=500, csv_dir=None, append_csv=True):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.detections_saved = 0
+        self.categories_saved = 0
+        self._detections = []
+        self._categories = []
+        self._csv_files = []
+        self._csv_writers = None
+
+        if csv_dir:
+            os.makedirs(csv_dir, exist_ok=True)
+            self._csv_writers = {}
+            for name, columns in (('yolo_detections', DETECTION_COLUMNS), ('image_categories', CATEGORY_COLUMNS)):
+                path = os.path.join(csv_dir, f"{name}.csv")
+                write_header = not (append_csv and os.path.exists(path))
+                f = open(path, 'a' if append_csv else 'w', newline='', encoding='utf-8')
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(columns)
+                self._csv_files.append(f)
+                self._csv_writers[name] = writer
+
+    def write(self, detections, categories):
+        """detections is a columnar batch (see detect_images)."""
+        self._detections.append(detections)
+        self._categories.extend(categories)
+        # Chunks are counted in images so a chunk's detections and categories commit together
+        if len(self._categories) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._categories:
+            return
+        detections, categories = self._detections, self._categories
+        self._detections, self._categories = [], []
+        processed_paths = [c['image_path'] for c in categories]
+
+        with self.conn.cursor() as cur:
+            # Every categorized image was (re)processed: drop its old detections
+            # so re-runs replace rather than duplicate them
+            cur.execute(
+                "DELETE FROM raw.yolo_detections WHERE image_path = ANY(%s);",
+                (processed_paths,)
+            )
+
+            if any(detection_count(batch) for batch in detections):
+                buffer, _ = rows_to_copy_buffer(
+                    row for batch in detections for row in detection_rows(batch)
+                )
+                cur.copy_expert(
+                    f"COPY raw.yolo_detections ({', '.join(DETECTION_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+
+            # Upsert categories; one row per message_id since the statement
+            # can't update the same key twice
+            by_message = {c['message_id']: c for c in categories}
+            execute_values(cur, """
                 INSERT INTO raw.image_categories (message_id, channel_name, image_path, category)
-                VALUES (%s, %s, %s, %s)
+                VALUES %s
                 ON CONFLICT (message_id) 
                 DO UPDATE SET category = EXCLUDED.category, image_path = EXCLUDED.image_path, processed_date = CURRENT_TIMESTAMP;
-            """, args_list_cat)
-            
-        conn.commit()
+            """, [tuple(c[col] for col in CATEGORY_COLUMNS) for c in by_message.values()])
+
+            # Remember what was processed (in the same transaction as the results)
+            processed_args = [
+                (img_path, *image_signature(img_path))
+                for img_path in processed_paths if os.path.exists(img_path)
+            ]
+            if processed_args:
+                execute_values(cur, """
+                    INSERT INTO raw.processed_images (image_path, file_size, file_mtime)
+                    VALUES %s
+                    ON CONFLICT (image_path)
+                    DO UPDATE SET file_size = EXCLUDED.file_size, file_mtime = EXCLUDED.file_mtime, processed_at = CURRENT_TIMESTAMP;
+                """, processed_args)
+        self.conn.commit()
+
+        if self._csv_writers:
+            for batch in detections:
+                self._csv_writers['yolo_detections'].writerows(detection_rows(batch))
+            self._csv_writers['image_categories'].writerows(
+                tuple(c[col] for col in CATEGORY_COLUMNS) for c in categories
+            )
+            for f in self._csv_files:
+                f.flush()
+
+        self.detections_saved += sum(detection_count(batch) for batch in detections)
+        self.categories_saved += len(categories)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for f in self._csv_files:
+                f.close()
+            self._csv_files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, psycopg2.Error):
+            # The transaction is broken; earlier chunks are already committed
+            self.conn.rollback()
+            self._detections, self._categories = [], []
+        # Otherwise commit whatever completed before an error, so the run can resume
+        self.close()
+
+def run_enrichment(model_path='yolov8n.pt', images_dir='data/raw/images', batch_size=16, prefetch_workers=2,
+                   incremental=True, workers=1, chunk_size=500, output_path='data/processed',
+                   cache_path=DEFAULT_CACHE_PATH, backend='torch', conn=None, image_paths=None):
+    """
+    Streaming pipeline: run detection and flush each chunk to Postgres and CSV
+    as it completes. Memory stays bounded by chunk_size, not the archive size.
+    Pass conn to reuse an existing connection (it is left open); otherwise
+    one is opened and closed here.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    create_detection_table(conn)
+    try:
+        # Full refreshes rewrite the CSV exports; incremental runs append to them
+        with DetectionSink(conn, chunk_size=chunk_size, csv_dir=output_path, append_csv=incremental) as sink:
+            for detections, categories in iter_detections(
+                model_path, images_dir, batch_size=batch_size, prefetch_workers=prefetch_workers,
+                incremental=incremental, workers=workers, cache_path=cache_path, backend=backend, conn=conn,
+                image_paths=image_paths
+            ):
+                sink.write(detections, categories)
+    finally:
+        if own_conn:
+            conn.close()
+    print(f"Saved {sink.detections_saved} detections and {sink.categories_saved} classifications "
+          f"to DB and CSVs in {output_path}.")
+    return sink.detections_saved, sink.categories_saved
+
+def save_to_db(detections, categories):
+    conn = get_db_connection()
+    create_detection_table(conn)
+    with DetectionSink(conn, chunk_size=max(len(categories), 1)) as sink:
+        sink.write(records_to_detection_columns(detections), categories)
     conn.close()
     print(f"Saved {len(detections)} detections and {len(categories)} classifications to DB.")
 
 def save_to_csv(detections, categories, output_path='data/processed'):
+    import pandas as pd
+
     os.makedirs(output_path, exist_ok=True)
     
     if detections:
@@ -190,8 +802,50 @@ def save_to_csv(detections, categories, output_path='data/processed'):
         
     print(f"Saved CSVs to {output_path}")
 
-if __name__ == "__main__":
-    detections, categories = run_detection()
-    save_to_csv(detections, categories)
-    save_to_db(detections, categories)
+def main():
+    parser = argparse.ArgumentParser(description="YOLO enrichment of scraped Telegram images")
+    parser.add_argument("--model", default="yolov8n.pt", help="YOLO weights (default: yolov8n.pt)")
+    parser.add_argument("--images-dir", default="data/raw/images", help="Image root (default: data/raw/images)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Images per inference call (default: 16)")
+    parser.add_argument("--prefetch-workers", type=int, default=2,
+                        help="Threads decoding images ahead of inference (default: 2)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Inference processes, each with its own model (default: 1)")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="Re-run the model on every image, not just new or changed ones")
+    parser.add_argument("--chunk-size", type=int, default=500,
+                        help="Images per DB/CSV flush and commit (default: 500)")
+    parser.add_argument("--output-path", default="data/processed", help="CSV export directory (default: data/processed)")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH,
+                        help=f"SQLite detection cache (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the model, ignoring the cache")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="Inference runtime; onnx/openvino are exported and cached on first use (default: torch)")
+    parser.add_argument("--check-parity", type=int, metavar="N",
+                        help="Compare --backend against PyTorch on N images and exit")
+    args = parser.parse_args()
 
+    if args.check_parity:
+        sample = sorted(glob.glob(os.path.join(args.images_dir, '**', '*.jpg'), recursive=True))[:args.check_parity]
+        mismatches = check_backend_parity(args.model, args.backend, sample)
+        for mismatch in mismatches:
+            print(mismatch)
+        print(f"Parity {args.backend} vs torch on {len(sample)} images: "
+              f"{'OK' if not mismatches else f'{len(mismatches)} mismatches'}")
+        sys.exit(1 if mismatches else 0)
+
+    run_enrichment(
+        model_path=args.model,
+        images_dir=args.images_dir,
+        batch_size=args.batch_size,
+        prefetch_workers=args.prefetch_workers,
+        incremental=not args.full_refresh,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        output_path=args.output_path,
+        cache_path=None if args.no_cache else args.cache_path,
+        backend=args.backend,
+    )
+
+if __name__ == "__main__":
+    main()
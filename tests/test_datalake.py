@@ -0,0 +1,153 @@
+import os
+
+import pytest
+
+from src.datalake import (
+    iter_channel_messages,
+    list_channel_message_files,
+    open_channel_messages_writer,
+    partition_image_paths,
+    read_channel_messages_json,
+    read_messages_parquet,
+    read_scrape_state,
+    write_channel_messages_json,
+    write_channel_messages_parquet,
+    write_manifest,
+    write_scrape_state,
+)
+
+
+def test_scrape_state_round_trip(tmp_path):
+    base_path = str(tmp_path)
+    assert read_scrape_state(base_path) == {}
+
+    write_scrape_state(base_path=base_path, high_water_marks={"tikvahpharma": 42})
+    assert read_scrape_state(base_path) == {"tikvahpharma": 42}
+
+
+def test_read_channel_messages_json(tmp_path):
+    base_path = str(tmp_path)
+    assert read_channel_messages_json(base_path, "2026-01-01", "tikvahpharma") == []
+
+    messages = [{"message_id": 1, "message_text": "ሰላም"}]
+    write_channel_messages_json(
+        base_path=base_path, date_str="2026-01-01", channel_name="tikvahpharma", messages=messages
+    )
+    assert read_channel_messages_json(base_path, "2026-01-01", "tikvahpharma") == messages
+
+
+def test_streaming_writer_is_atomic_and_appends(tmp_path):
+    base_path = str(tmp_path)
+
+    with open_channel_messages_writer(
+        base_path=base_path, date_str="2026-01-01", channel_name="tikvahpharma", batch_size=2
+    ) as writer:
+        for i in range(3):
+            writer.write({"message_id": i})
+        # Nothing is published until the writer is closed
+        assert not os.path.exists(writer.out_path)
+
+    assert [m["message_id"] for m in iter_channel_messages(writer.out_path)] == [0, 1, 2]
+    assert not os.path.exists(writer.tmp_path)
+
+    with open_channel_messages_writer(
+        base_path=base_path, date_str="2026-01-01", channel_name="tikvahpharma", append=True
+    ) as writer:
+        writer.write({"message_id": 3})
+
+    assert [m["message_id"] for m in iter_channel_messages(writer.out_path)] == [0, 1, 2, 3]
+
+
+def test_streaming_writer_discards_on_error(tmp_path):
+    base_path = str(tmp_path)
+    with open_channel_messages_writer(
+        base_path=base_path, date_str="2026-01-01", channel_name="tikvahpharma"
+    ) as writer:
+        writer.write({"message_id": 1})
+
+    with pytest.raises(RuntimeError):
+        with open_channel_messages_writer(
+            base_path=base_path, date_str="2026-01-01", channel_name="tikvahpharma"
+        ) as writer:
+            writer.write({"message_id": 2})
+            raise RuntimeError("network error")
+
+    # The failed rewrite left the published partition alone
+    assert [m["message_id"] for m in iter_channel_messages(writer.out_path)] == [1]
+    assert not os.path.exists(writer.tmp_path)
+
+
+def test_list_channel_message_files_reads_both_layouts(tmp_path):
+    base_path = str(tmp_path)
+    write_channel_messages_json(
+        base_path=base_path, date_str="2026-01-01", channel_name="legacy", messages=[{"message_id": 1}]
+    )
+    with open_channel_messages_writer(base_path=base_path, date_str="2026-01-02", channel_name="new") as w:
+        w.write({"message_id": 2})
+    write_manifest(base_path=base_path, date_str="2026-01-02", channel_message_counts={"new": 1})
+
+    files = list_channel_message_files(base_path)
+    assert [os.path.basename(p) for p in files] == ["legacy.json", "new.jsonl"]
+    assert [m["message_id"] for p in files for m in iter_channel_messages(p)] == [1, 2]
+
+
+def test_list_channel_message_files_prunes_partitions(tmp_path):
+    base_path = str(tmp_path)
+    for date_str in ("2026-01-01", "2026-01-05", "2026-01-09"):
+        for channel in ("tikvahpharma", "tenamereja"):
+            write_channel_messages_json(
+                base_path=base_path, date_str=date_str, channel_name=channel, messages=[]
+            )
+
+    files = list_channel_message_files(
+        base_path, start_date="2026-01-02", end_date="2026-01-09", channels=["@tenamereja"]
+    )
+    assert [os.path.relpath(p, base_path) for p in files] == [
+        os.path.join("raw", "telegram_messages", "2026-01-05", "tenamereja.json"),
+        os.path.join("raw", "telegram_messages", "2026-01-09", "tenamereja.json"),
+    ]
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    base_path = str(tmp_path)
+    messages = [
+        {
+            "message_id": 7,
+            "channel_name": "tikvahpharma",
+            "channel_title": "Tikvah Pharma",
+            "message_date": "2026-01-01T08:30:00+00:00",
+            "message_text": "Paracetamol",
+            "has_media": False,
+            "image_path": None,
+            "views": 10,
+            "forwards": 1,
+        }
+    ]
+    path = write_channel_messages_parquet(
+        base_path=base_path, date_str="2026-01-01", channel_name="tikvahpharma", messages=messages
+    )
+    assert list(iter_channel_messages(path)) == messages
+
+    table = read_messages_parquet(base_path, channels=["tikvahpharma"], columns=["message_id", "views"])
+    assert table.column_names == ["message_id", "views"]
+    assert table.to_pylist() == [{"message_id": 7, "views": 10}]
+    assert read_messages_parquet(base_path, start_date="2026-02-01").num_rows == 0
+
+
+def test_partition_image_paths_only_returns_the_days_downloaded_images(tmp_path):
+    base_path = str(tmp_path)
+    image = tmp_path / "raw" / "images" / "tikvahpharma" / "1.jpg"
+    image.parent.mkdir(parents=True)
+    image.write_bytes(b"jpg")
+    messages = [
+        {"message_id": 1, "image_path": str(image)},
+        {"message_id": 2, "image_path": None},
+        {"message_id": 3, "image_path": str(image.parent / "3.jpg")},  # download failed
+    ]
+    write_channel_messages_json(
+        base_path=base_path, date_str="2026-01-01", channel_name="tikvahpharma", messages=messages
+    )
+
+    assert partition_image_paths(base_path, "2026-01-01") == [str(image)]
+    assert partition_image_paths(base_path, "2026-01-02") == []
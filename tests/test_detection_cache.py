@@ -0,0 +1,55 @@
+from src.detection_cache import DetectionCache, file_content_hash, model_cache_key
+
+
+def test_cache_round_trip_and_miss(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with DetectionCache(path, "yolov8n.pt") as cache:
+        cache.put_many({"abc": [["bottle", 0.9, 1.0, 2.0, 3.0, 4.0]], "empty": []})
+        found = cache.get_many(["abc", "empty", "missing"])
+
+    assert found == {"abc": [["bottle", 0.9, 1.0, 2.0, 3.0, 4.0]], "empty": []}
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_cache_invalidated_when_model_changes(tmp_path):
+    weights = tmp_path / "model.pt"
+    weights.write_bytes(b"v1")
+    path = str(tmp_path / "cache.sqlite")
+
+    with DetectionCache(path, model_cache_key(str(weights))) as cache:
+        cache.put_many({"abc": []})
+
+    weights.write_bytes(b"v2")
+    with DetectionCache(path, model_cache_key(str(weights))) as cache:
+        assert cache.get_many(["abc"]) == {}
+
+
+def test_file_content_hash_ignores_path(tmp_path):
+    a = tmp_path / "a.jpg"
+    b = tmp_path / "b.jpg"
+    a.write_bytes(b"same photo")
+    b.write_bytes(b"same photo")
+    assert file_content_hash(str(a)) == file_content_hash(str(b))
+
+
+def test_switching_backend_keeps_other_backend_entries(tmp_path):
+    weights = tmp_path / "model.pt"
+    weights.write_bytes(b"v1")
+    path = str(tmp_path / "cache.sqlite")
+    key = model_cache_key(str(weights))
+
+    with DetectionCache(path, key, variant="torch") as cache:
+        cache.put_many({"abc": [["bottle", 0.9, 1.0, 2.0, 3.0, 4.0]]})
+    with DetectionCache(path, key, variant="onnx") as cache:
+        assert cache.get_many(["abc"]) == {}
+        cache.put_many({"abc": [["bottle", 0.89, 1.0, 2.0, 3.0, 4.0]]})
+    with DetectionCache(path, key, variant="torch") as cache:
+        assert cache.get_many(["abc"]) == {"abc": [["bottle", 0.9, 1.0, 2.0, 3.0, 4.0]]}
+
+    # New weights still drop every backend's entries
+    weights.write_bytes(b"v2")
+    with DetectionCache(path, model_cache_key(str(weights)), variant="onnx") as cache:
+        pass
+    with DetectionCache(path, key, variant="torch", keep_other_models=True) as cache:
+        assert cache.get_many(["abc"]) == {}
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("dotenv")
+
+from scripts import loader
+
+
+@pytest.fixture
+def partition(tmp_path):
+    path = tmp_path / "tikvahpharma.jsonl"
+    path.write_text('{"message_id":1}\n', encoding="utf-8")
+    stat = os.stat(path)
+    ledger = {"2026-01-01/tikvahpharma.jsonl": (stat.st_size, stat.st_mtime, loader.file_sha256(str(path)))}
+    return str(path), ledger
+
+
+def test_same_size_and_mtime_skips_without_hashing(partition, monkeypatch):
+    path, ledger = partition
+
+    def fail(*args, **kwargs):
+        raise AssertionError("file was hashed")
+
+    monkeypatch.setattr(loader, "file_sha256", fail)
+    needs_load, size, mtime, content_hash = loader.check_ledger(path, "2026-01-01/tikvahpharma.jsonl", ledger)
+    assert not needs_load
+    assert (size, mtime, content_hash) == ledger["2026-01-01/tikvahpharma.jsonl"]
+
+
+def test_touched_but_identical_file_skips_with_new_mtime(partition):
+    path, ledger = partition
+    old_mtime = ledger["2026-01-01/tikvahpharma.jsonl"][1]
+    os.utime(path, (old_mtime + 60, old_mtime + 60))
+
+    needs_load, _, mtime, content_hash = loader.check_ledger(path, "2026-01-01/tikvahpharma.jsonl", ledger)
+    assert not needs_load
+    # The new mtime is reported so the ledger can be updated and the next run skips the hash
+    assert mtime == old_mtime + 60
+    assert content_hash == ledger["2026-01-01/tikvahpharma.jsonl"][2]
+
+
+def test_changed_content_needs_reload(partition):
+    path, ledger = partition
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"message_id":2}\n')
+
+    needs_load, size, _, content_hash = loader.check_ledger(path, "2026-01-01/tikvahpharma.jsonl", ledger)
+    assert needs_load
+    assert size == os.path.getsize(path)
+    assert content_hash == loader.file_sha256(path)
+    assert content_hash != ledger["2026-01-01/tikvahpharma.jsonl"][2]
+
+
+def test_unknown_file_needs_load(partition):
+    path, _ = partition
+    assert loader.check_ledger(path, "2026-01-01/tikvahpharma.jsonl", {})[0]
@@ -0,0 +1,26 @@
+import csv
+
+from src.pg_copy import copy_value, rows_to_copy_buffer
+
+
+def test_null_and_empty_string_are_distinct():
+    # COPY (FORMAT csv): unquoted empty field = NULL, quoted "" = empty string
+    assert copy_value(None) == ""
+    assert copy_value("") == '""'
+    assert copy_value(42) == "42"
+
+    buffer, count = rows_to_copy_buffer([("tikvahpharma", None, "", 7)])
+    assert count == 1
+    assert buffer.getvalue() == '"tikvahpharma",,"",7\n'
+
+
+def test_embedded_quotes_commas_and_newlines_round_trip():
+    rows = [
+        ("tikvahpharma", 1, 'Paracetamol "500mg", 20 birr'),
+        ("tenamereja", 2, "line one\nline two,\r\nline three"),
+        ("tenamereja", 3, 'ሰላም ""quoted"" \\N'),
+    ]
+    buffer, count = rows_to_copy_buffer(rows)
+    assert count == 3
+    parsed = list(csv.reader(buffer))
+    assert parsed == [[channel, str(message_id), text] for channel, message_id, text in rows]
@@ -0,0 +1,21 @@
+from src.pg_indexes import RAW_INDEXES, index_statements
+
+
+def test_index_statements_are_idempotent_and_schema_qualified():
+    statements = list(index_statements(["telegram_messages"], schema="bench"))
+    assert len(statements) == len(RAW_INDEXES["telegram_messages"])
+    assert all(s.startswith("CREATE INDEX IF NOT EXISTS ") for s in statements)
+    assert all(" ON bench.telegram_messages USING " in s for s in statements)
+
+
+def test_index_names_are_unique():
+    names = [name for indexes in RAW_INDEXES.values() for name, _, _ in indexes]
+    assert len(names) == len(set(names))
+
+
+def test_index_statements_skip_existing_indexes():
+    names = [name for name, _, _ in RAW_INDEXES["telegram_messages"]]
+    all_statements = list(index_statements(["telegram_messages"]))
+
+    assert list(index_statements(["telegram_messages"], existing=set(names[1:]))) == all_statements[:1]
+    assert list(index_statements(["telegram_messages"], existing=set(names))) == []
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+from src.rate_limit import TokenBucket
+
+
+def test_burst_then_rate_limited():
+    bucket = TokenBucket(rate=50, burst=3)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    start = time.monotonic()
+    asyncio.run(take(3))
+    assert time.monotonic() - start < 0.05
+
+    start = time.monotonic()
+    asyncio.run(take(5))
+    # 5 extra tokens at 50/s need ~0.1s
+    assert time.monotonic() - start >= 0.08
+
+
+def test_flood_wait_pauses_and_slows_down():
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.on_flood_wait(0.1)
+    assert bucket.rate == 50
+    assert bucket.flood_waits == 1
+
+    start = time.monotonic()
+    asyncio.run(bucket.acquire())
+    assert time.monotonic() - start >= 0.1
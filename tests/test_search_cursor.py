@@ -0,0 +1,18 @@
+import pytest
+
+for required in ("fastapi", "sqlalchemy", "psycopg2", "dotenv"):
+    pytest.importorskip(required)
+
+from fastapi import HTTPException
+
+from api.main import decode_search_cursor, encode_search_cursor
+
+
+def test_search_cursor_round_trip():
+    assert decode_search_cursor(encode_search_cursor(0.0607927, 42)) == (0.0607927, 42)
+
+
+def test_invalid_search_cursor_is_rejected():
+    with pytest.raises(HTTPException) as excinfo:
+        decode_search_cursor("not-a-cursor")
+    assert excinfo.value.status_code == 400
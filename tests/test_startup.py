@@ -0,0 +1,21 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_yolo_detect_import_does_not_load_heavy_dependencies():
+    for required in ("numpy", "psycopg2", "dotenv"):
+        pytest.importorskip(required)
+
+    probe = (
+        "import sys, src.yolo_detect; "
+        "print(','.join(m for m in ('ultralytics', 'torch', 'pandas', 'cv2') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
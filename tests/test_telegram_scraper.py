@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telethon")
+pytest.importorskip("dotenv")
+
+from telethon.tl.types import MessageMediaPhoto
+
+from scripts.telegram import HISTORY_PAGE_SIZE, MAX_DOWNLOAD_ATTEMPTS, scrape_all_channels
+from src.datalake import (
+    channel_messages_jsonl_path,
+    iter_channel_messages,
+    read_failed_downloads,
+    read_scrape_state,
+)
+from src.rate_limit import TokenBucket
+
+
+class FakeClient:
+    """Serves `limit` text-only messages per channel, one request per history page."""
+
+    def __init__(self, fail_after=None):
+        self.requests = 0
+        self.fail_after = fail_after
+
+    async def start(self):
+        pass
+
+    async def get_entity(self, channel):
+        self.requests += 1
+        return SimpleNamespace(title=channel.strip("@"))
+
+    async def iter_messages(self, entity, limit, min_id=0, reverse=False, wait_time=None):
+        for i in range(limit):
+            if i == self.fail_after:
+                raise ConnectionError("connection reset")
+            if i % HISTORY_PAGE_SIZE == 0:
+                self.requests += 1
+            yield SimpleNamespace(
+                id=i + 1,
+                date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                message=f"message {i}",
+                media=None,
+                views=0,
+                forwards=0,
+            )
+            await asyncio.sleep(0)
+
+
+def test_rate_limit_is_charged_per_request_not_per_message(tmp_path):
+    channels = [f"@channel{i}" for i in range(4)]
+    limit = 3 * HISTORY_PAGE_SIZE
+    rate = 20.0
+    client = FakeClient()
+
+    start = time.monotonic()
+    stats = asyncio.run(
+        scrape_all_channels(
+            client,
+            channels,
+            str(tmp_path),
+            limit=limit,
+            concurrency=len(channels),
+            rate_limiter=TokenBucket(rate=rate, burst=1),
+            incremental=False,
+            date_str="2026-01-01",
+        )
+    )
+    elapsed = time.monotonic() - start
+
+    assert stats == {channel: limit for channel in channels}
+    # One entity lookup + three history pages per channel
+    assert client.requests == len(channels) * 4
+    # ~ (requests - burst) / rate = 0.75s; per message it would be 60s
+    assert (client.requests - 1) / rate * 0.9 <= elapsed < client.requests / rate + 1.0
+
+
+def test_failed_full_refresh_keeps_the_existing_partition(tmp_path):
+    base_path = str(tmp_path)
+
+    def scrape(client):
+        return asyncio.run(
+            scrape_all_channels(
+                client,
+                ["@tikvahpharma"],
+                base_path,
+                limit=5,
+                message_delay=0,
+                channel_delay=0,
+                incremental=False,
+                date_str="2026-01-01",
+            )
+        )
+
+    assert scrape(FakeClient()) == {"@tikvahpharma": 5}
+
+    # A network error halfway through a re-fetch discards the partial rewrite
+    assert scrape(FakeClient(fail_after=2)) == {"@tikvahpharma": 0}
+    path = channel_messages_jsonl_path(base_path, "2026-01-01", "tikvahpharma")
+    assert [m["message_id"] for m in iter_channel_messages(path)] == [1, 2, 3, 4, 5]
+    assert not os.path.exists(f"{path}.tmp")
+
+
+class PhotoClient:
+    """A channel whose message 2 is a photo; downloads fail while `failing` is set."""
+
+    def __init__(self):
+        self.failing = True
+        self.messages = {
+            i: SimpleNamespace(
+                id=i,
+                date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                message=f"message {i}",
+                media=MessageMediaPhoto() if i == 2 else None,
+                views=0,
+                forwards=0,
+            )
+            for i in (1, 2, 3)
+        }
+
+    async def start(self):
+        pass
+
+    async def get_entity(self, channel):
+        return SimpleNamespace(title=channel.strip("@"))
+
+    async def iter_messages(self, entity, limit, min_id=0, reverse=False, wait_time=None):
+        for message_id in sorted(self.messages)[:limit]:
+            if message_id > min_id:
+                yield self.messages[message_id]
+
+    async def get_messages(self, entity, ids):
+        return [self.messages.get(message_id) for message_id in ids]
+
+    async def download_media(self, media, path):
+        if self.failing:
+            raise ConnectionError("download interrupted")
+        with open(path, "wb") as f:
+            f.write(b"jpeg")
+
+
+def test_failed_photo_downloads_are_retried_on_later_runs(tmp_path):
+    base_path = str(tmp_path)
+    client = PhotoClient()
+
+    def scrape(date_str):
+        asyncio.run(
+            scrape_all_channels(
+                client, ["@tikvahpharma"], base_path, message_delay=0, channel_delay=0, date_str=date_str
+            )
+        )
+        path = channel_messages_jsonl_path(base_path, date_str, "tikvahpharma")
+        return {m["message_id"]: m["image_path"] for m in iter_channel_messages(path)}
+
+    assert scrape("2026-01-01") == {1: None, 2: None, 3: None}
+    # The high-water mark moves on, but the failed photo is remembered
+    assert read_scrape_state(base_path) == {"tikvahpharma": 3}
+    assert read_failed_downloads(base_path) == {"tikvahpharma": {2: 1}}
+
+    client.failing = False
+    image_path = os.path.join(base_path, "raw", "images", "tikvahpharma", "2.jpg")
+    # No new messages, but message 2 is re-fetched and recorded with its photo
+    assert scrape("2026-01-02") == {2: image_path}
+    assert read_failed_downloads(base_path) == {}
+
+
+def test_failed_photo_downloads_are_given_up_after_max_attempts(tmp_path):
+    base_path = str(tmp_path)
+    client = PhotoClient()
+    for attempt in range(MAX_DOWNLOAD_ATTEMPTS):
+        assert read_failed_downloads(base_path) == ({"tikvahpharma": {2: attempt}} if attempt else {})
+        asyncio.run(
+            scrape_all_channels(
+                client, ["@tikvahpharma"], base_path, message_delay=0, channel_delay=0, date_str="2026-01-01"
+            )
+        )
+    assert read_failed_downloads(base_path) == {}
+    # Retries that failed again didn't add duplicate records
+    path = channel_messages_jsonl_path(base_path, "2026-01-01", "tikvahpharma")
+    assert sorted(m["message_id"] for m in iter_channel_messages(path)) == [1, 2, 3]
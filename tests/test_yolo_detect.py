@@ -0,0 +1,183 @@
+import os
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("psycopg2")
+pytest.importorskip("dotenv")
+
+from src import yolo_detect
+from src.yolo_detect import (
+    compare_detections,
+    detect_images,
+    detections_to_records,
+    exported_model_path,
+    iter_shape_batches,
+    resolve_model,
+)
+
+
+def images(shapes):
+    return [(f"{i}.jpg", np.zeros(shape, dtype=np.uint8)) for i, shape in enumerate(shapes)]
+
+
+def test_shape_batches_group_by_shape():
+    decoded = images([(2, 2, 3), (4, 2, 3), (2, 2, 3), (4, 2, 3), (2, 2, 3)])
+    batches = [[path for path, _ in batch] for batch in iter_shape_batches(decoded, batch_size=2)]
+    assert batches == [["0.jpg", "2.jpg"], ["1.jpg", "3.jpg"], ["4.jpg"]]
+
+
+def test_shape_batches_flush_oldest_bucket_when_buffer_is_full():
+    # Every image a different shape, so no bucket ever fills a batch
+    decoded = images([(i + 1, 1, 3) for i in range(10)])
+    consumed = 0
+
+    def stream():
+        nonlocal consumed
+        for item in decoded:
+            consumed += 1
+            yield item
+
+    flushed = []
+    for batch in iter_shape_batches(stream(), batch_size=4, max_buffered=3):
+        flushed.extend(path for path, _ in batch)
+        # Images read but not yet yielded never exceed max_buffered
+        assert consumed - len(flushed) <= 3
+
+    # Oldest bucket first
+    assert flushed == [f"{i}.jpg" for i in range(10)]
+
+
+def test_compare_detections_matches_within_tolerance():
+    expected = [("bottle", 0.91), ("person", 0.50), ("bottle", 0.40)]
+    # Same detections in another order, confidences off by less than conf_tol
+    actual = [("bottle", 0.405), ("person", 0.51), ("bottle", 0.90)]
+    assert compare_detections(expected, actual, conf_tol=0.02) == []
+
+
+def test_compare_detections_reports_mismatches():
+    expected = [("bottle", 0.91), ("person", 0.50)]
+    assert compare_detections(expected, [("bottle", 0.91)]) == ["classes ['bottle', 'person'] vs ['bottle']"]
+    assert compare_detections(expected, [("bottle", 0.80), ("person", 0.50)]) == [
+        "bottle confidences [0.91] vs [0.8]"
+    ]
+    # An extra box of the same class is a mismatch even with close confidences
+    assert compare_detections(expected, expected + [("person", 0.50)]) == [
+        "person confidences [0.5] vs [0.5, 0.5]"
+    ]
+
+
+def test_resolve_model_reuses_export_until_weights_change(tmp_path, monkeypatch):
+    weights = tmp_path / "yolov8n.pt"
+    weights.write_bytes(b"weights")
+    exports = []
+
+    class FakeYOLO:
+        def __init__(self, path):
+            self.path = path
+
+        def export(self, format, dynamic):
+            exports.append(format)
+            exported = exported_model_path(self.path, format)
+            with open(exported, "wb") as f:
+                f.write(b"exported")
+            return exported
+
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FakeYOLO))
+
+    assert resolve_model(str(weights), "torch") == str(weights)
+    onnx_path = resolve_model(str(weights), "onnx")
+    assert onnx_path == str(tmp_path / "yolov8n.onnx")
+    # Cached export is reused
+    assert resolve_model(str(weights), "onnx") == onnx_path
+    assert exports == ["onnx"]
+
+    # New weights invalidate the export
+    os.utime(weights, (os.path.getmtime(onnx_path) + 10,) * 2)
+    resolve_model(str(weights), "onnx")
+    assert exports == ["onnx", "onnx"]
+
+    with pytest.raises(ValueError):
+        exported_model_path(str(weights), "tensorrt")
+
+
+class FakeTensor:
+    """Stands in for a torch tensor: .cpu().numpy() returns the array."""
+
+    def __init__(self, array):
+        self.array = np.asarray(array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class FakeBoxes:
+    def __init__(self, boxes):
+        self.cls = FakeTensor(np.array([b[0] for b in boxes], dtype=np.float64))
+        self.conf = FakeTensor(np.array([b[1] for b in boxes], dtype=np.float64))
+        self.xyxy = FakeTensor(np.array([b[2] for b in boxes], dtype=np.float64).reshape(-1, 4))
+
+    def __len__(self):
+        return len(self.conf.array)
+
+
+class FakeModel:
+    """Returns canned boxes per image; each image's first pixel holds its index."""
+
+    names = {0: "person", 1: "bottle", 2: "cup"}
+
+    def __init__(self, boxes_per_image):
+        self.boxes_per_image = boxes_per_image
+
+    def __call__(self, images, verbose=False):
+        return [
+            types.SimpleNamespace(boxes=FakeBoxes(self.boxes_per_image[int(image[0, 0, 0])]))
+            for image in images
+        ]
+
+
+def test_detect_images_columns_match_per_box_records(monkeypatch):
+    boxes_per_image = [
+        [(1, 0.9, (1, 2, 3, 4)), (0, 0.8, (5, 6, 7, 8))],  # bottle + person
+        [],                                                 # nothing detected
+        [(0, 0.7, (0, 0, 10, 10))],                         # person only
+        [(2, 0.6, (1, 1, 2, 2)), (2, 0.5, (3, 3, 4, 4))],   # two cups
+    ]
+    metadata = {f"data/raw/images/tikvahpharma/{i + 10}.jpg": ("tikvahpharma", i + 10) for i in range(4)}
+
+    def decoded(paths, prefetch_workers=2, prefetch_size=64):
+        for i, path in enumerate(paths):
+            yield path, np.full((8, 8, 3), i, dtype=np.uint8)
+
+    monkeypatch.setattr(yolo_detect, "iter_decoded_images", decoded)
+    model = FakeModel(boxes_per_image)
+    (detections, categories), = detect_images(model, metadata, batch_size=4)
+
+    # What the per-box loop used to build
+    expected = [
+        {
+            "image_path": path,
+            "message_id": message_id,
+            "channel_name": channel_name,
+            "detected_class": model.names[cls_id],
+            "confidence": conf,
+            "x1": xyxy[0],
+            "y1": xyxy[1],
+            "x2": xyxy[2],
+            "y2": xyxy[3],
+        }
+        for (path, (channel_name, message_id)), boxes in zip(metadata.items(), boxes_per_image)
+        for cls_id, conf, xyxy in boxes
+    ]
+    assert detections_to_records(detections) == expected
+
+    # Each image is classified from its own slice of the batch's detections
+    assert [c["category"] for c in categories] == ["promotional", "no_content", "lifestyle", "product_display"]
+    assert [(c["image_path"], c["channel_name"], c["message_id"]) for c in categories] == [
+        (path, channel_name, message_id) for path, (channel_name, message_id) in metadata.items()
+    ]